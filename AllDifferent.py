@@ -0,0 +1,185 @@
+# global constraint that every variable in its scope takes a different value. filtering is done with
+# regin's algorithm: a maximum matching between variables and values, then every value that can't be part
+# of any maximum matching is removed, which is arc consistency on the whole constraint rather than on pairs
+class AllDifferent:
+    def __init__(self, variables):
+        self.variables = list(variables)    # scope, list of variable ints
+        self.matching = {}                  # last matching found, variable -> value, reused as a start
+
+    # returns true if value of var in given partial assignment differs from every other assigned variable
+    def is_consistent(self, partial_assignment, var):
+        value = partial_assignment[var]
+        for other in self.variables:
+            if other != var and partial_assignment[other] == value:
+                return False
+        return True
+
+    # returns set of other assigned variables in the scope with the same value as var
+    # for conflict-directed backjumping
+    def conflict_set(self, partial_assignment, var):
+        value = partial_assignment[var]
+        conflict = set()
+        for other in self.variables:
+            if other != var and partial_assignment[other] == value:
+                conflict.add(other)
+        return conflict
+
+    # removes value of var from the domains of every other unassigned variable in the scope, returns list of
+    # variables whose domains changed, or None if some domain became empty
+    # for forward checking
+    def forward_check(self, partial_assignment, domains, var):
+        changed = []
+        value = partial_assignment[var]
+        for other in self.variables:
+            if other != var and partial_assignment[other] is None and domains.contains(other, value):
+                changed.append(other)
+                if domains.remove_value(other, value) == 0:
+                    return None
+        return changed
+
+    # regin filtering, returns list of variables whose domains changed, or None if no matching covers the scope
+    def propagate(self, domains):
+        if not self.find_matching(domains):
+            return None
+
+        variables = self.variables
+        count = len(variables)
+        position = {}
+        for i in range(count):
+            position[variables[i]] = i
+
+        # graph nodes are variables 0..count - 1 and values count + value. matched edges go from variable to
+        # value, every other edge goes from value to variable
+        value_nodes = {}
+        for var in variables:
+            mask = domains.domains[var]
+            while mask:
+                low = mask & -mask
+                value = low.bit_length() - 1
+                if value not in value_nodes:
+                    value_nodes[value] = []
+                if self.matching[var] != value:
+                    value_nodes[value].append(position[var])
+                mask ^= low
+
+        graph = {}
+        for i in range(count):
+            graph[i] = [count + self.matching[variables[i]]]
+        for value in value_nodes.keys():
+            graph[count + value] = value_nodes[value]
+
+        # an edge is allowed if it is in the matching, on an alternating cycle (both ends in the same strongly
+        # connected component) or on an alternating path from a free value (reachable from a free value)
+        matched_values = set(self.matching[var] for var in variables)
+        reachable = set()
+        stack = [count + value for value in value_nodes.keys() if value not in matched_values]
+        while stack:
+            node = stack.pop()
+            if node not in reachable:
+                reachable.add(node)
+                stack.extend(graph[node])
+
+        component = strongly_connected_components(graph)
+
+        changed = []
+        for i in range(count):
+            var = variables[i]
+            removed = 0
+            mask = domains.domains[var]
+            while mask:
+                low = mask & -mask
+                value = low.bit_length() - 1
+                node = count + value
+                if value != self.matching[var] and node not in reachable and component[node] != component[i]:
+                    removed |= low
+                mask ^= low
+            if removed:
+                domains.remove(var, removed)
+                changed.append(var)
+
+        return changed
+
+    # updates self.matching to a matching covering every variable in the scope, returns false if there is none
+    def find_matching(self, domains):
+        owner = {}  # value -> variable matched to it
+        for var in self.variables:
+            value = self.matching.get(var)
+            if value is not None and domains.contains(var, value) and value not in owner:
+                owner[value] = var
+            else:
+                self.matching[var] = None
+
+        for var in self.variables:
+            if self.matching[var] is None and not self.augment(var, domains, owner, set()):
+                return False
+        return True
+
+    # looks for an alternating path from var to a free value, flipping it into the matching if found
+    def augment(self, var, domains, owner, visited):
+        mask = domains.domains[var]
+        while mask:
+            low = mask & -mask
+            value = low.bit_length() - 1
+            mask ^= low
+            if value in visited:
+                continue
+            visited.add(value)
+            if value not in owner or self.augment(owner[value], domains, owner, visited):
+                owner[value] = var
+                self.matching[var] = value
+                return True
+        return False
+
+
+# returns dictionary mapping each node of given graph (dictionary from node to list of nodes) to the index
+# of its strongly connected component, using an iterative version of tarjan's algorithm
+def strongly_connected_components(graph):
+    index = {}
+    lowlink = {}
+    component = {}
+    on_stack = set()
+    stack = []
+    counter = 0
+    components = 0
+
+    for root in graph.keys():
+        if root in index:
+            continue
+        work = [(root, 0)]
+        while work:
+            node, edge = work.pop()
+            if edge == 0:
+                index[node] = lowlink[node] = counter
+                counter += 1
+                stack.append(node)
+                on_stack.add(node)
+
+            recurse = False
+            edges = graph[node]
+            while edge < len(edges):
+                child = edges[edge]
+                edge += 1
+                if child not in index:
+                    work.append((node, edge))
+                    work.append((child, 0))
+                    recurse = True
+                    break
+                elif child in on_stack:
+                    lowlink[node] = min(lowlink[node], index[child])
+            if recurse:
+                continue
+
+            if lowlink[node] == index[node]:
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component[member] = components
+                    if member == node:
+                        break
+                components += 1
+
+            if work:
+                parent = work[-1][0]
+                lowlink[parent] = min(lowlink[parent], lowlink[node])
+
+    return component
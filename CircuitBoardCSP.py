@@ -1,54 +1,108 @@
 # Paolo Takagi-Atilano, October 17, 2017
 
+import os
+
 from ConstraintSatisfactionProblem import ConstraintSatisfactionProblem
+from CompiledCSP import save_csp, load_csp
+from Relation import Relation
+from DancingLinks import DancingLinks
 
 
 class CircuitBoardCSP:
-    def __init__(self, length, height, pieces_list, square):
+    # compiled is the path of a file holding the CSP as written by CompiledCSP.save_csp. it is loaded instead
+    # of building the constraints when it was written for the same grid and pieces, and written after building
+    # them otherwise
+    def __init__(self, length, height, pieces_list, square, compiled=None):
         self.length = length            # length of grid
         self.height = height            # height of grid
         self.pieces_list = pieces_list  # list of pieces
 
-        self.constraints = self.set_constraints(square)     # constraints
-        self.CSP = ConstraintSatisfactionProblem(len(pieces_list), self.length * self.height, self.constraints)  # CSP
+        self.placements = self.set_placements()             # squares covered by each piece at each corner
+        self.domains = self.set_domains()                   # legal corners of each piece
+        self.CSP = None
+        source = "CircuitBoardCSP {:d} {:d} {}".format(length, height, [tuple(piece) for piece in pieces_list])
+        if compiled is not None and os.path.exists(compiled):
+            self.CSP = load_csp(compiled, self.domains, source, len(pieces_list), self.length * self.height)
+        if self.CSP is None:
+            self.constraints = self.set_constraints(square)     # constraints
+            self.CSP = ConstraintSatisfactionProblem(len(pieces_list), self.length * self.height,
+                                                     self.constraints, self.domains)  # CSP
+            if compiled is not None:
+                save_csp(self.CSP, compiled, source)
+        else:
+            self.constraints = self.CSP.constraints.constraints
+        self.CSP.symmetric_variables = self.set_symmetric_pieces()
+
+    # returns list, for each piece, of dictionary mapping each legal left-hand corner to the bitset of grid
+    # squares the piece covers there, bit y * length + x for square x, y
+    def set_placements(self):
+        placements = []
+        for piece in self.pieces_list:
+            shape = 0
+            for y in range(piece[2]):
+                shape |= ((1 << piece[1]) - 1) << self.coord_to_int(0, y)
+
+            piece_placements = {}
+            for y in range(self.height - piece[2] + 1):
+                for x in range(self.length - piece[1] + 1):
+                    piece_placements[self.coord_to_int(x, y)] = shape << self.coord_to_int(x, y)
+            placements.append(piece_placements)
+
+        return placements
 
     # set constraints for CSP
     def set_constraints(self, square):  # square format: (letter, length, height)
         constraints = {}
 
-        pieces_location_list = []   # list of sets of all legal left-hand corners of each piece, for each piece
-        for piece in self.pieces_list:
-            # get set of all legal left-hand corners of each piece
-            piece_location_set = set()
-            for y in range(self.height):
-                for x in range(self.length):
-                    if x + piece[1] - 1 < self.length and y + piece[2] - 1 < self.height:
-                        piece_location_set.add((piece, x, y))   # potential location of piece, and that piece
-                        #print(piece_location_set)
-            pieces_location_list.append(piece_location_set)
-
-        for i in range(len(pieces_location_list)):
-            for j in range(len(pieces_location_list)):
+        # for each piece, bitset of its corners that cover each grid square
+        covers = []
+        for piece_placements in self.placements:
+            piece_covers = [0] * (self.length * self.height)
+            for corner in piece_placements.keys():
+                occupied = piece_placements[corner]
+                while occupied:
+                    low = occupied & -occupied
+                    piece_covers[low.bit_length() - 1] |= 1 << corner
+                    occupied ^= low
+            covers.append(piece_covers)
+
+        # two pieces may not overlap: corners of j allowed with each corner of i are all legal corners of j
+        # except those covering some square i covers
+        for i in range(len(self.pieces_list)):
+            for j in range(len(self.pieces_list)):
                 if i != j:  # make sure we aren't comparing the same piece
-                    common_location_list1 = set()    # set of all legal left-hand corners of pieces i and j
-                    common_location_list2 = set()
-
-                    for i_loc in pieces_location_list[i]:
-                        for j_loc in pieces_location_list[j]:
-                            #print("i_loc", i_loc, "j_loc:", j_loc)
-                            #print(collision(i_loc, j_loc))
-                            if not collision(i_loc, j_loc):
-                                #print("adding:", (self.coord_to_int(i_loc[1], i_loc[2]),
-                                # self.coord_to_int(j_loc[1], j_loc[2])  ))
-                                common_location_list1.add( (self.coord_to_int(i_loc[1], i_loc[2]),
-                                                           self.coord_to_int(j_loc[1], j_loc[2])  ))
-                                common_location_list2.add( (self.coord_to_int(j_loc[1], j_loc[2]),
-                                                           self.coord_to_int(i_loc[1], i_loc[2])  ))
-                    constraints[(i, j)] = common_location_list1
-                    constraints[(j, i)] = common_location_list2
+                    legal = 0
+                    for corner in self.placements[j].keys():
+                        legal |= 1 << corner
+
+                    rows = [0] * (self.length * self.height)
+                    for corner in self.placements[i].keys():
+                        colliding = 0
+                        occupied = self.placements[i][corner]
+                        while occupied:
+                            low = occupied & -occupied
+                            colliding |= covers[j][low.bit_length() - 1]
+                            occupied ^= low
+                        rows[corner] = legal & ~colliding
+                    constraints[(i, j)] = Relation(rows)
 
         return constraints
 
+    # returns list of groups of pieces of the same size, which can swap places in any layout. the search keeps
+    # each group in increasing order of corner, otherwise every layout would be found again with them swapped
+    def set_symmetric_pieces(self):
+        groups = {}
+        for i in range(len(self.pieces_list)):
+            groups.setdefault(tuple(self.pieces_list[i][1:]), []).append(i)
+        return [group for group in groups.values() if len(group) > 1]
+
+    # returns dictionary mapping each piece to the list of its legal left-hand corners, so it stays on the grid
+    def set_domains(self):
+        domains = {}
+        for i in range(len(self.pieces_list)):
+            domains[i] = list(self.placements[i].keys())
+        return domains
+
     # given x and y values, return corresponding single int for some grid
     def coord_to_int(self, x, y):
         return y * self.length + x
@@ -57,18 +111,104 @@ class CircuitBoardCSP:
     def int_to_coord(self, var):
         return var % self.length, int(var / self.length)
 
-    # calls backtrack search object from CSP, and returns output plus some syntax
-    def backtrack_search(self, mrv, lcv, inference):
-        self.CSP.backtrack_search(mrv, lcv, inference)
+    # calls backtrack search object from CSP, and returns output plus some syntax, options are passed on to
+    # the CSP search
+    def backtrack_search(self, mrv, lcv, inference, **options):
+        self.CSP.backtrack_search(mrv, lcv, inference, **options)
+        return self.solution_to_str(self.CSP.assignment) + "\n" + str(self.CSP.fails) + " fails" + "\n"
+
+    # keeps piece i at left-hand corner x, y, which must be a legal corner of it, until unplaced
+    def place_piece(self, i, x, y):
+        self.CSP.fix(i, self.coord_to_int(x, y))
+
+    # lets piece i go anywhere on the grid again
+    def unplace_piece(self, i):
+        self.CSP.unfix(i)
+
+    # lays out the pieces again after some were placed or unplaced, starting from the last layout, see
+    # ConstraintSatisfactionProblem.resolve
+    def resolve(self, mrv, lcv, inference, repair_steps=1000, **options):
+        self.CSP.resolve(mrv, lcv, inference, repair_steps, **options)
+        return self.solution_to_str(self.CSP.assignment) + "\n" + str(self.CSP.fails) + " fails" + "\n"
+
+    # generator of every layout as a solution string, found one at a time by backtrack search
+    def layouts(self, mrv, lcv, inference):
+        for solution in self.CSP.solutions(mrv, lcv, inference):
+            yield self.solution_to_str(solution)
+
+    # returns number of layouts without listing them
+    def count_layouts(self):
+        return self.CSP.count_solutions()
+
+    # backtrack search, served from given SolutionCache when the same problem was solved before, see
+    # ConstraintSatisfactionProblem.cached_search
+    def cached_search(self, cache, mrv, lcv, inference, **options):
+        self.CSP.cached_search(cache, mrv, lcv, inference, **options)
         return self.solution_to_str(self.CSP.assignment) + "\n" + str(self.CSP.fails) + " fails" + "\n"
 
+    # runs several search configurations in parallel and keeps the first to finish, see
+    # Portfolio.portfolio_search, and returns output plus some syntax
+    def portfolio_search(self, configurations=None, workers=None, timeout=None):
+        self.CSP.portfolio_search(configurations, workers, timeout)
+        return self.solution_to_str(self.CSP.assignment) + "\n" + str(self.CSP.fails) + " fails" + "\n"
+
+    # builds exact cover matrix with one primary column per piece, so each is placed once, and one column per
+    # grid square, primary if the board must be completely filled and secondary otherwise. returns the
+    # DancingLinks object and the (piece, corner) of every row
+    def exact_cover_matrix(self, fill_board):
+        pieces = len(self.pieces_list)
+        squares = self.length * self.height
+        if fill_board:
+            links = DancingLinks(pieces + squares)
+        else:
+            links = DancingLinks(pieces, squares)
+
+        rows = []
+        for i in range(pieces):
+            for corner in self.placements[i].keys():
+                columns = [i]
+                occupied = self.placements[i][corner]
+                while occupied:
+                    low = occupied & -occupied
+                    columns.append(pieces + low.bit_length() - 1)
+                    occupied ^= low
+                links.add_row(columns)
+                rows.append((i, corner))
+
+        return links, rows
+
+    # generator of every layout as a solution string, found with dancing links instead of backtrack search
+    def exact_covers(self, fill_board):
+        links, rows = self.exact_cover_matrix(fill_board)
+        for cover in links.search():
+            solution = [None] * len(self.pieces_list)
+            for row in cover:
+                solution[rows[row][0]] = rows[row][1]
+            yield self.solution_to_str(solution)
+
+    # solves as an exact cover problem with dancing links, leaving the solution in the CSP assignment, and
+    # returns output plus some syntax
+    def exact_cover_search(self, fill_board):
+        links, rows = self.exact_cover_matrix(fill_board)
+        cover = links.solve()
+        for i in range(len(self.pieces_list)):
+            self.CSP.assignment[i] = None
+        if cover is None:
+            return "no solution\n" + str(links.updates) + " updates" + "\n"
+
+        for row in cover:
+            self.CSP.assignment[rows[row][0]] = rows[row][1]
+        return self.solution_to_str(self.CSP.assignment) + "\n" + str(links.updates) + " updates" + "\n"
+
     # returns solution with nice syntax, rather than integers
     def solution_to_str(self, solution):
         sol_dict = {}
         sol_str = ""
 
-        # iterate through pieces:
+        # iterate through placed pieces:
         for i in range(len(self.pieces_list)):
+            if solution[i] is None:
+                continue
             # iterate through x and y values in each piece
             for x in range(self.pieces_list[i][1]):
                 for y in range(self.pieces_list[i][2]):
@@ -90,15 +230,3 @@ class CircuitBoardCSP:
 
         return sol_str
 
-
-# resorts to brute force because some objects might not be rectangular
-def collision(i_loc, j_loc):        # piece location: (piece, x, y), piece: (letter, length, height)
-    for i_x in range(i_loc[1], i_loc[1] + i_loc[0][1]):  # iterate through x in first piece
-        for i_y in range(i_loc[2], i_loc[2] + i_loc[0][2]):  # iterate through y in first piece
-            for j_x in range(j_loc[1], j_loc[1] + j_loc[0][1]):  # iterate through x in second piece
-                for j_y in range(j_loc[2], j_loc[2] + j_loc[0][2]):  # iterate through y in second piece
-                    if i_x == j_x and i_y == j_y:
-                        #print("collision", str(i_loc[0][0]), str(j_loc[0][0]), str(i_x), str(i_y))
-                        return True
-    # no collisions found
-    return False
@@ -0,0 +1,211 @@
+import hashlib
+import mmap
+import os
+import struct
+
+from ConstraintSatisfactionProblem import ConstraintSatisfactionProblem
+from Relation import MappedRelation, NotEqual, LessThan, GreaterThan, NoOverlap
+from AllDifferent import AllDifferent
+from DomainStore import bits_to_values
+
+# a compiled CSP file is, all numbers little endian:
+#   header: magic, version, sha256 digest of the source string describing what the CSP was built from, number
+#           of variables and of values, and the number of restricted domains, relations, arcs and global
+#           constraints
+#   domains: variable of every restricted domain, then its bitset of values, row_bytes long
+#   relations: kind and five parameters of every distinct relation. tables have the position of their rows
+#   neighbor index: for every variable the position of its first arc, then the neighbor and relation of every
+#           arc, both directions stored, sorted by first variable
+#   global constraints: kind and scope length of each, then every scope
+#   tables: for every value of the first variable, the bitset of allowed values of the second, row_bytes long
+MAGIC = b"CSPC"
+VERSION = 2
+HEADER = struct.Struct("<4sI32s6I")
+RELATION = struct.Struct("<I5Q")
+GLOBAL = struct.Struct("<2I")
+
+# kinds of relations stored as their parameters rather than as tables. any other relation is stored as a table
+TABLE = 0
+INTENSIONAL = {NotEqual: 1, LessThan: 2, GreaterThan: 3, NoOverlap: 4}
+GLOBALS = {AllDifferent: 0}
+
+
+# writes given CSP to the file at path, with variables fixed since construction as restricted domains. source
+# is a string describing what the CSP was built from, such as the arguments of its constructor, so loading
+# can tell whether the file is for the same problem. the file is written next to path and then moved there,
+# so CSPs still mapping an older file at path keep reading the old one
+def save_csp(csp, path, source=""):
+    n = csp.assignment_length
+    d = csp.domain_length
+    row_bytes = (d + 7) // 8
+    full = (1 << d) - 1
+
+    domains = csp.restricted_domains()
+    restricted = sorted(domains.keys())
+    domain_rows = []
+    for var in restricted:
+        allowed = 0
+        for value in domains[var]:
+            allowed |= 1 << value
+        domain_rows.append(allowed.to_bytes(row_bytes, "little"))
+
+    # relations shared by several arcs, or tables with the same rows, are stored once
+    relations = []      # (kind, parameters, table bytes or None)
+    index_of = {}       # id of relation object or table bytes -> index in relations
+    arcs = []           # (first variable, neighbor, relation index)
+    for (i, j) in sorted(csp.constraints.constraints.keys()):
+        relation = csp.constraints.constraints[(i, j)]
+        r = index_of.get(id(relation))
+        if r is None:
+            kind = INTENSIONAL.get(type(relation))
+            if kind is None:
+                table = b"".join(relation.supports(a, full).to_bytes(row_bytes, "little") for a in range(d))
+                r = index_of.get(table)
+                if r is None:
+                    r = index_of[table] = len(relations)
+                    relations.append((TABLE, None, table))
+            else:
+                parameters = [0] * 5
+                if kind == INTENSIONAL[NoOverlap]:
+                    parameters = [relation.length1, relation.height1, relation.length2, relation.height2,
+                                  relation.grid_length]
+                r = len(relations)
+                relations.append((kind, parameters, None))
+            index_of[id(relation)] = r
+        arcs.append((i, j, r))
+
+    first_arc = [0] * (n + 1)
+    for (i, j, r) in arcs:
+        first_arc[i + 1] += 1
+    for var in range(n):
+        first_arc[var + 1] += first_arc[var]
+
+    global_constraints = csp.constraints.global_constraints
+    scopes = []
+    for constraint in global_constraints:
+        scopes.extend(constraint.variables)
+
+    sections = [HEADER.pack(MAGIC, VERSION, digest(source), n, d, len(restricted), len(relations), len(arcs),
+                            len(global_constraints)),
+                struct.pack("<{:d}I".format(len(restricted)), *restricted)]
+    sections.extend(domain_rows)
+
+    # tables go last, so their positions are known once everything before them is
+    table_offset = sum(len(section) for section in sections) + RELATION.size * len(relations) + \
+        4 * (n + 1 + 2 * len(arcs)) + GLOBAL.size * len(global_constraints) + 4 * len(scopes)
+    tables = []
+    for (kind, parameters, table) in relations:
+        if kind == TABLE:
+            sections.append(RELATION.pack(TABLE, table_offset, 0, 0, 0, 0))
+            tables.append(table)
+            table_offset += len(table)
+        else:
+            sections.append(RELATION.pack(kind, *parameters))
+
+    sections.append(struct.pack("<{:d}I".format(n + 1), *first_arc))
+    sections.append(struct.pack("<{:d}I".format(len(arcs)), *[j for (i, j, r) in arcs]))
+    sections.append(struct.pack("<{:d}I".format(len(arcs)), *[r for (i, j, r) in arcs]))
+    for constraint in global_constraints:
+        sections.append(GLOBAL.pack(GLOBALS[type(constraint)], len(constraint.variables)))
+    sections.append(struct.pack("<{:d}I".format(len(scopes)), *scopes))
+    sections.extend(tables)
+
+    with open(path + ".tmp", "wb") as output:
+        output.write(b"".join(sections))
+    os.replace(path + ".tmp", path)
+
+
+# returns the CSP in the file at path, written by save_csp, or None if the file does not hold a whole compiled
+# CSP saved with the same source string, or with a different number of variables or values than given. the file
+# is memory mapped read only and relation tables are read from it as needed, so they are never copied and
+# processes loading the same file share them. given domains, a dictionary as taken by
+# ConstraintSatisfactionProblem, replace the ones in the file
+def load_csp(path, domains=None, source="", assignment_length=None, domain_length=None):
+    with open(path, "rb") as input_file:
+        if os.fstat(input_file.fileno()).st_size < HEADER.size:    # an empty file can't be mapped at all
+            return None
+        buffer = memoryview(mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ))
+    magic, version = struct.unpack_from("<4sI", buffer)
+    if magic != MAGIC or version != VERSION:
+        return None
+    magic, version, source_digest, n, d, domain_count, relation_count, arc_count, global_count = \
+        HEADER.unpack_from(buffer)
+    if source_digest != digest(source) or assignment_length not in (None, n) or domain_length not in (None, d):
+        return None
+    row_bytes = (d + 7) // 8
+
+    # the file must hold every section the header counts, so a truncated file is never read past its end
+    tables_start = HEADER.size + (4 + row_bytes) * domain_count + RELATION.size * relation_count + \
+        4 * (n + 1 + 2 * arc_count) + GLOBAL.size * global_count
+    if len(buffer) < tables_start:
+        return None
+    position = HEADER.size
+
+    restricted = struct.unpack_from("<{:d}I".format(domain_count), buffer, position)
+    position += 4 * domain_count
+    if domains is None:
+        domains = {}
+        for var in restricted:
+            domains[var] = bits_to_values(int.from_bytes(buffer[position:position + row_bytes], "little"))
+            position += row_bytes
+    else:
+        position += row_bytes * domain_count
+
+    kinds = {}
+    for relation_type in INTENSIONAL.keys():
+        kinds[INTENSIONAL[relation_type]] = relation_type
+    entries = list(RELATION.iter_unpack(buffer[position:position + RELATION.size * relation_count]))
+    table_bytes = 0
+    for (kind, p1, p2, p3, p4, p5) in entries:
+        if kind == TABLE:
+            table_bytes += row_bytes * d
+        elif kind not in kinds:
+            return None
+    relations = []
+    for (kind, p1, p2, p3, p4, p5) in entries:
+        if kind == TABLE:
+            relations.append(MappedRelation(buffer, p1, row_bytes, d))
+        elif kind == INTENSIONAL[NoOverlap]:
+            relations.append(NoOverlap(p1, p2, p3, p4, p5))
+        else:
+            relations.append(kinds[kind]())
+    position += RELATION.size * relation_count
+
+    first_arc = struct.unpack_from("<{:d}I".format(n + 1), buffer, position)
+    position += 4 * (n + 1)
+    neighbors = struct.unpack_from("<{:d}I".format(arc_count), buffer, position)
+    position += 4 * arc_count
+    relation_of = struct.unpack_from("<{:d}I".format(arc_count), buffer, position)
+    position += 4 * arc_count
+
+    constraints = {}
+    for var in range(n):
+        for arc in range(first_arc[var], first_arc[var + 1]):
+            constraints[(var, neighbors[arc])] = relations[relation_of[arc]]
+
+    global_types = {}
+    for constraint_type in GLOBALS.keys():
+        global_types[GLOBALS[constraint_type]] = constraint_type
+    entries = list(GLOBAL.iter_unpack(buffer[position:position + GLOBAL.size * global_count]))
+    position += GLOBAL.size * global_count
+
+    # scopes and then tables take up the rest of the file exactly
+    scope_bytes = 4 * sum(length for (kind, length) in entries)
+    if len(buffer) != tables_start + scope_bytes + table_bytes:
+        return None
+    for (kind, length) in entries:
+        if kind not in global_types:
+            return None
+
+    global_constraints = []
+    for (kind, length) in entries:
+        scope = struct.unpack_from("<{:d}I".format(length), buffer, position)
+        position += 4 * length
+        global_constraints.append(global_types[kind](scope))
+
+    return ConstraintSatisfactionProblem(n, d, constraints, domains, global_constraints)
+
+
+# returns sha256 digest of given source string, as stored in the header
+def digest(source):
+    return hashlib.sha256(source.encode()).digest()
@@ -1,87 +1,124 @@
 # Paolo Takagi-Atilano, October 17, 2017
 
+from Relation import Relation, PredicateRelation, Conjunction
+
+
 class Constraint:
-    def __init__(self, constraints):
-        # this is a dictionary, where 2-int tuples map to sets of 2-int tuples
-        # two variables map to all their corresponding constraints
-        self.constraints = constraints
-
-    # returns true if given partial assignment fulfills constraints, false otherwise
-    def is_satisfied(self, partial_assignment):
-        # partial assignment is a set of ints
-
-        for i in range(len(partial_assignment)):
-            for j in range(len(partial_assignment)):
-                if partial_assignment[i] is not None and partial_assignment[j] is not None \
-                        and i != j and (i,j) in self.constraints.keys():
-                    #print("i: ", i)
-                    #print("j: ", j)
-                    if (partial_assignment[i], partial_assignment[j]) not in self.constraints[(i,j)]:
-                        return False
+    def __init__(self, constraints, global_constraints=None):
+        # this is a dictionary, where 2-int tuples map to relation objects
+        # two variables map to all their corresponding constraints. sets of 2-int tuples are converted to
+        # Relation objects, and functions taking two values to PredicateRelation objects
+        self.constraints = {}
+        for arc in constraints.keys():
+            self.constraints[arc] = to_relation(constraints[arc])
+
+        # every arc is stored in both directions
+        for (i, j) in list(self.constraints.keys()):
+            if (j, i) not in self.constraints:
+                self.constraints[(j, i)] = self.constraints[(i, j)].transpose()
+
+        # dictionary mapping each variable to the set of variables it shares a constraint with,
+        # built once so consistency checks only need to look at neighbors
+        self.neighbors = {}
+        for (i, j) in self.constraints.keys():
+            self.neighbors.setdefault(i, set()).add(j)
+
+        # list of constraints over more than two variables, such as AllDifferent, and dictionary mapping each
+        # variable to the indices of the ones it is in
+        if global_constraints is None:
+            global_constraints = []
+        self.global_constraints = list(global_constraints)
+        self.globals_of = {}
+        for g in range(len(self.global_constraints)):
+            for var in self.global_constraints[g].variables:
+                self.globals_of.setdefault(var, []).append(g)
+
+    # adds constraint between var1 and var2, given in any form accepted by the constructor. if the two already
+    # share a constraint, both must hold from now on
+    def add(self, var1, var2, relation):
+        relation = to_relation(relation)
+        if (var1, var2) in self.constraints:
+            relation = Conjunction(self.constraints[(var1, var2)], relation)
+        self.constraints[(var1, var2)] = relation
+        self.constraints[(var2, var1)] = relation.transpose()
+        self.neighbors.setdefault(var1, set()).add(var2)
+        self.neighbors.setdefault(var2, set()).add(var1)
+
+    # removes every constraint between var1 and var2
+    def remove(self, var1, var2):
+        self.constraints.pop((var1, var2), None)
+        self.constraints.pop((var2, var1), None)
+        self.neighbors.get(var1, set()).discard(var2)
+        self.neighbors.get(var2, set()).discard(var1)
+
+    # returns true if the value of var in given partial assignment is consistent with all of its assigned
+    # neighbors, only checks constraints involving var, so the rest of the assignment is assumed consistent
+    def is_consistent(self, partial_assignment, var):
+        value = partial_assignment[var]
+        for neighbor in self.neighbors.get(var, ()):
+            other = partial_assignment[neighbor]
+            if other is None:
+                continue
+            if not self.constraints[(var, neighbor)].allows(value, other):
+                return False
+
+        for g in self.globals_of.get(var, ()):
+            if not self.global_constraints[g].is_consistent(partial_assignment, var):
+                return False
 
         return True
 
-    # returns number of values no longer accessible in domain for particular index given some partial assignment
-    # for mrv heuristic
-    def possible_count(self, partial_assignment, index):
-        count = 0
-        constrained_domains = set()
-        for i in range(len(partial_assignment)):
-            # if already set neighbor, then it is constraining given index:
-            if partial_assignment[i] is not None and (i, index) in self.constraints.keys() and \
-                            partial_assignment[i] not in constrained_domains:
-                constrained_domains.add(partial_assignment[i])
-                count += 1
-
-        return count
-
-    # given value, returns tuple: (value, number of values it rules out for all adjacent variables)
-    # for assumed variable, aka insert_index
-    # for lcv heuristic
-    def constrain_count(self, partial_assignment, insert_index, domain_value):
-        # copy the list, and add potential value
-        potential_assignment = []
-        for i in range(len(partial_assignment)):
-            potential_assignment.append(partial_assignment[i])
-        potential_assignment[insert_index] = domain_value
-
-        count = 0
-
-        # iterate through all unassigned neighbors of i
-        for i in range(len(potential_assignment)):
-            not_yet_constrained = True
-            # check to see if unassigned neighbor
-            if potential_assignment[i] is None and (insert_index, i) in self.constraints.keys():
-
-                #for constraint in self.constraints[(insert_index, i)]:
-                #    for
-
-                # also iterate through other assigned neighbors of i, to make sure value is not already constrained
-                for j in range(len(potential_assignment)):
-                    if j != insert_index and potential_assignment[j] is not None and (j, i) in self.constraints.keys():
-                        if potential_assignment[j] == domain_value:
-                            not_yet_constrained = False
-
-                if not_yet_constrained:
-                    count += 1
-
-        return domain_value, count
-
-    # returns set of arcs of given var and unassigned neighbors of given partial assignment
+    # returns set of assigned variables whose values conflict with the value of var in given partial assignment
+    # for conflict-directed backjumping
+    def conflict_set(self, partial_assignment, var):
+        conflict = set()
+        value = partial_assignment[var]
+        for neighbor in self.neighbors.get(var, ()):
+            other = partial_assignment[neighbor]
+            if other is not None and not self.constraints[(var, neighbor)].allows(value, other):
+                conflict.add(neighbor)
+
+        for g in self.globals_of.get(var, ()):
+            conflict.update(self.global_constraints[g].conflict_set(partial_assignment, var))
+
+        return conflict
+
+    # returns set of arcs from unassigned neighbors of given var to var, given partial assignment
     # for mac-3 inference
     def unassigned_neighbors(self, partial_assignment, var):
         neighbors = set()
 
-        for i in range(len(partial_assignment)):
-            if partial_assignment[i] is None and (var, i) in self.constraints.keys():
-                neighbors.add((var, i))
+        for i in self.neighbors.get(var, ()):
+            if partial_assignment[i] is None:
                 neighbors.add((i, var))
 
         return neighbors
 
+    # returns number of other variables given var shares a binary or global constraint with
+    def degree(self, var):
+        others = set(self.neighbors.get(var, ()))
+        for g in self.globals_of.get(var, ()):
+            others.update(self.global_constraints[g].variables)
+        others.discard(var)
+        return len(others)
+
+    # returns set of every arc
+    def all_arcs(self):
+        return set(self.constraints.keys())
+
     # returns constraints between two variables
     def get_constraints(self, var1, var2):
         if (var1, var2) in self.constraints.keys():
             return self.constraints[(var1, var2)]
         else:
             return None
+
+
+# returns given relation as an object with supports: sets of 2-int tuples become Relation objects and
+# functions taking two values PredicateRelation objects
+def to_relation(relation):
+    if hasattr(relation, "supports"):
+        return relation
+    if callable(relation):
+        return PredicateRelation(relation)
+    return Relation.from_pairs(relation)
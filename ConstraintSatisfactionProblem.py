@@ -1,11 +1,29 @@
 # Paolo Takagi-Atilano, October 17, 2017
 
+import random
+
 from Constraint import Constraint
+from Relation import NotEqual
+from AllDifferent import AllDifferent
+from DomainStore import DomainStore
+from NogoodStore import NogoodStore
+from SearchEngine import SearchEngine
+from SearchStats import SearchStats
+from VariableHeap import VariableHeap
+from WeightedDegreeHeap import WeightedDegreeHeap
+from SupportCounts import SupportCounts
+from LocalSearch import MinConflicts
+from Portfolio import portfolio_search
+from ParallelSearch import parallel_search
+from Decomposition import decomposed_search
+from SolutionCounter import count_solutions
+from SolutionCache import fingerprint
 
 
 class ConstraintSatisfactionProblem:
-    def __init__(self, assignment_length, domain_length, constraints):
-        self.fails = 0
+    def __init__(self, assignment_length, domain_length, constraints, domains=None, global_constraints=None):
+        self.stats = SearchStats()      # counters for the last search
+        self.listeners = []             # functions called with (event, var, value) as the search runs
 
         self.assignment = []                        # array of ints
         self.assignment_length = assignment_length  # int corresponding to number of variables
@@ -15,84 +33,341 @@ class ConstraintSatisfactionProblem:
 
         self.domain_length = domain_length          # int corresponding to number of entries in domain
 
-        self.constraints = Constraint(constraints)
+        # dictionary mapping variables to the iterable of values they are restricted to, all other variables
+        # can be any value in the domain
+        if domains is None:
+            domains = {}
+        self.initial_domains = domains
+        self.fixes = {}     # dictionary mapping variables fixed since construction to their value
+
+        self.constraints = Constraint(constraints, global_constraints)
+        self.interchangeable = self.detect_value_symmetry()     # whether values can be renamed freely
+        # list of groups of variables whose values can be swapped in any solution to give another one, such as
+        # pieces of the same size, set by whoever knows the problem has them
+        self.symmetric_variables = []
+        self.problem_fingerprint = None                         # computed when first needed
+
+        # current domains of every variable, shared by the search, heuristics and inference
+        self.domains = DomainStore(assignment_length, domain_length)
+
+        # dictionary mapping each arc to a dictionary from value to its last found support, for mac_revise.
+        # a residue stays a valid support as long as the constraint does, so these never need undoing
+        self.residues = {}
+
+        self.last_solution = None   # list of values of the last solution found, to start from after changes
+        self.dirty = set()          # variables whose constraints or domains were tightened since then
+        self.preferred = None       # list of values the search tries first for each variable, if any
+
+    # returns true if the values are interchangeable: every constraint only asks for different values and
+    # every domain is either all values or a single one, so renaming values that no variable is restricted
+    # to turns a solution into another solution
+    def detect_value_symmetry(self):
+        for relation in self.constraints.constraints.values():
+            if not isinstance(relation, NotEqual):
+                return False
+        for constraint in self.constraints.global_constraints:
+            if not isinstance(constraint, AllDifferent):
+                return False
+        domains = self.restricted_domains()
+        for var in domains.keys():
+            if len(set(domains[var])) not in (1, self.domain_length):
+                return False
+        return True
+
+    # runs setup, then runs backtrack search to the end. with backjump, conflict-directed backjumping jumps
+    # straight back to the most recent variable responsible for a failure, and with a nogood_limit above 0
+    # up to that many failing partial assignments are remembered and pruned when they come up again. a seed
+    # randomizes the order values are tried in, ties only when using lcv, and ties between variables. fixed
+    # is a dictionary of variables whose domains are restricted to a single value before the search starts.
+    # wdeg chooses variables by dom/wdeg instead, and restarts, "luby" or "geometric", starts the search over
+    # whenever the fails since the last restart reach a cutoff growing from restart_base. with
+    # break_symmetry, when the values are interchangeable only one value not used so far is tried per variable,
+    # and otherwise the unfixed variables of each group of symmetric_variables take increasing values
+    def backtrack_search(self, mrv, lcv, infer, backjump=False, nogood_limit=0, seed=None, fixed=None,
+                         wdeg=False, restarts=None, restart_base=100, break_symmetry=True):
+        engine = self.start_search(mrv, lcv, infer, backjump, nogood_limit, seed, fixed, wdeg, restarts,
+                                   restart_base, break_symmetry)
+        if engine.run() == "solved":
+            self.last_solution = list(self.assignment)
+            self.dirty = set()
+            return self.assignment
+        return None
 
-    # runs setup, then starts recursive backtrack search
-    def backtrack_search(self, mrv, lcv, infer):
+    # runs setup, then returns SearchEngine for the search without running it, so it can be run a number of
+    # steps at a time, paused and inspected
+    def start_search(self, mrv, lcv, infer, backjump=False, nogood_limit=0, seed=None, fixed=None,
+                     wdeg=False, restarts=None, restart_base=100, break_symmetry=True):
         # reset some necessary instance variables
-        self.fails = 0
+        self.stats = SearchStats()
         for i in range(self.assignment_length):
             self.assignment[i] = None
-
-        # calls the recursive backtrack search
-        self.backtrack_search_helper(mrv, lcv, infer, {})
-
-    # recursive backtrack search
-    def backtrack_search_helper(self, mrv, lcv, infer, inconsistencies):
-
-        print("Decided:", self.assignment)
-
-        # base case: assignment is complete and valid
-        if self.is_complete() and self.constraints.is_satisfied(self.assignment):
-            return self.assignment
-
-        # minimum remaining values heuristic
+        self.reset_domains()
+        if fixed is not None:
+            for var in fixed.keys():
+                self.domains.assign(var, fixed[var])
+
+        self.backjump = backjump or nogood_limit > 0
+        self.decisions = []                                 # variables in the order they were assigned
+        self.pruned_by = [[] for i in range(self.assignment_length)]   # variables whose values pruned each
+        self.nogoods = NogoodStore(nogood_limit)
+        self.random = None                                  # random.Random for value order, if seeded
+        if seed is not None:
+            self.random = random.Random(seed)
+
+        self.break_symmetry = break_symmetry and self.interchangeable
+        # bitset of values some variable is restricted to before the search, which are never interchangeable
+        self.used_values = 0
+        for var in range(self.assignment_length):
+            if self.domains.size(var) == 1:
+                self.used_values |= self.domains.domains[var]
+
+        # dictionaries mapping variables to the one before and after them in their group of symmetric variables,
+        # whose values the search keeps increasing along the group. fixed variables are left out, since they
+        # can't swap with the others. not combined with value symmetry, which already picks one solution out
+        # of each set of renamings, and might not pick the one in increasing order
+        self.smaller = {}
+        self.larger = {}
+        if break_symmetry and not self.break_symmetry:
+            for group in self.symmetric_variables:
+                free = [var for var in sorted(group) if var not in self.fixes and (fixed is None or
+                                                                                  var not in fixed)]
+                for i in range(1, len(free)):
+                    self.smaller[free[i]] = free[i - 1]
+                    self.larger[free[i - 1]] = free[i]
+
+        # weight of every constraint for dom/wdeg, starting at 1 and bumped whenever it empties a domain.
+        # binary constraints are keyed by their arc with the smaller variable first
+        self.arc_weights = {}
+        self.global_weights = [1] * len(self.constraints.global_constraints)
+
+        self.variable_heap = None                           # unassigned variables by domain size, for mrv
         if mrv:
-            var = self.mrv_heuristic()
-        else:
-            var = self.no_variable_heuristic()
-
-        # least constraining value heuristic
+            self.variable_heap = VariableHeap(self)
+        self.weight_heap = None                             # unassigned variables by dom/wdeg, for wdeg
+        if wdeg:
+            self.weight_heap = WeightedDegreeHeap(self)
+        self.support_counts = None                          # conflict counts of every value, for lcv
         if lcv:
-            domain_list = self.lcv_heuristic(var)
+            self.support_counts = SupportCounts(self)
+
+        self.engine = SearchEngine(self, mrv, lcv, infer, wdeg, restarts, restart_base)
+        return self.engine
+
+    # generator of every solution, each a new list, found one at a time by the same search continuing after
+    # the last solution, so solutions are never all held at once. symmetry breaking is off, since it skips
+    # solutions that only differ by renaming values or swapping symmetric variables
+    def solutions(self, mrv, lcv, infer, seed=None, fixed=None):
+        engine = self.start_search(mrv, lcv, infer, seed=seed, fixed=fixed, break_symmetry=False)
+        while engine.run() == "solved":
+            yield list(self.assignment)
+            engine.resume()
+
+    # returns number of solutions without listing them, see SolutionCounter.count_solutions
+    def count_solutions(self, cache_limit=100000):
+        return count_solutions(self, cache_limit)
+
+    # returns fingerprint identifying the problem, see SolutionCache.fingerprint
+    def fingerprint(self):
+        if self.problem_fingerprint is None:
+            self.problem_fingerprint = fingerprint(self)
+        return self.problem_fingerprint
+
+    # looks the problem up in given SolutionCache, and only runs backtrack search with given options if it
+    # isn't there, caching what it finds. variables fixed by the options are part of what is looked up.
+    # returns the assignment, or None if there is no solution
+    def cached_search(self, cache, mrv, lcv, infer, **options):
+        key = self.fingerprint()
+        if options.get("fixed"):
+            key = fingerprint(self, options["fixed"])
+
+        found, solution = cache.get(key)
+        if not found:
+            solution = self.backtrack_search(mrv, lcv, infer, **options)
+            cache.put(key, solution)
         else:
-            domain_list = []
-            for i in range(self.domain_length):
-                domain_list.append(i)
-
-        if infer:   # find infer values
-            if var in inconsistencies.keys():
-                for inconsistency in inconsistencies[var]:
-                    if inconsistency in domain_list:
-                        domain_list.remove(inconsistency)   # don't consider inconsistencies
-
-        #print("domain list: ", domain_list)
-        for val in domain_list:
-
-            self.assignment[var] = val
-            print("trying val; ", val, ";", self.assignment, ";", self.constraints.is_satisfied(self.assignment))
-
-            if self.constraints.is_satisfied(self.assignment):
-                if infer:
-                    inconsistencies = self.mac_infer(var)   # find inconsistencies from inference
-                    #print(inconsistencies)
-                    if inconsistencies is not None:
-                        result = self.backtrack_search_helper(mrv, lcv, infer, inconsistencies)
-                    else:
-                        return None
-
-                else:
-                    result = self.backtrack_search_helper(mrv, lcv, infer, inconsistencies)
-
-                if result is not None:  # potential value found, use it for previous recursive iteration
-                    return result
-
-            else:   # increment fails
-                self.fails += 1
-
-            # backtracking
-            self.assignment[var] = None
-
-        # no solution, return None
+            self.stats = SearchStats()  # nothing was searched
+            for i in range(self.assignment_length):
+                self.assignment[i] = None if solution is None else solution[i]
+            if solution is not None:
+                self.last_solution = list(solution)
+                self.dirty = set()
+
+        if solution is None:
+            return None
+        return self.assignment
+
+    # runs several search configurations in parallel processes and keeps the first one to finish, see
+    # Portfolio.portfolio_search
+    def portfolio_search(self, configurations=None, workers=None, timeout=None):
+        return portfolio_search(self, configurations, workers, timeout)
+
+    # splits the search tree into subtrees searched by several processes, see ParallelSearch.parallel_search
+    def parallel_search(self, mrv, lcv, infer, workers=None, split_depth=2, **options):
+        return parallel_search(self, mrv, lcv, infer, workers, split_depth, **options)
+
+    # solves every connected component of the constraint graph on its own, trees and near-trees without
+    # backtrack search, see Decomposition.decomposed_search
+    def decomposed_search(self, mrv, lcv, infer, workers=1, cutset_limit=8, **options):
+        return decomposed_search(self, mrv, lcv, infer, workers, cutset_limit, **options)
+
+    # min-conflicts local search with a tabu list, for instances too large for backtrack search. makes up to
+    # restarts + 1 attempts from random complete assignments of max_steps moves each, and returns the
+    # assignment if a solution is found, otherwise None. it can't prove there is no solution
+    def min_conflicts_search(self, max_steps, restarts=0, tabu_tenure=10, seed=None):
+        self.stats = SearchStats()
+        local_search = MinConflicts(self, tabu_tenure, seed)
+        if local_search.run(max_steps, restarts):
+            return self.assignment
         return None
 
-    # checks to see if assignment is complete
-    def is_complete(self):
-        for i in range(self.assignment_length):
-            if self.assignment[i] is None:
+    # number of failed values in the last search
+    @property
+    def fails(self):
+        return self.stats.fails
+
+    # adds function to be called as listener(event, var, value) during search, where event is "assign",
+    # "fail", "backtrack", "restart" or "solution". the search only builds events when some listener is
+    # attached
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        self.listeners.remove(listener)
+
+    # calls every listener with given event
+    def notify(self, event, var, value):
+        for listener in self.listeners:
+            listener(event, var, value)
+
+    # sets every domain back to the values given at construction, or the value it was fixed to since
+    def reset_domains(self):
+        self.domains = DomainStore(self.assignment_length, self.domain_length)
+        domains = self.restricted_domains()
+        for var in domains.keys():
+            allowed = 0
+            for value in domains[var]:
+                allowed |= 1 << value
+            self.domains.remove(var, ~allowed)
+
+    # returns dictionary mapping every restricted variable to the iterable of values it is restricted to
+    def restricted_domains(self):
+        if not self.fixes:
+            return self.initial_domains
+        domains = dict(self.initial_domains)
+        for var in self.fixes.keys():
+            domains[var] = [self.fixes[var]]
+        return domains
+
+    # adds constraint between var1 and var2, in any form the constructor accepts, on top of any already there
+    def add_constraint(self, var1, var2, relation):
+        self.constraints.add(var1, var2, relation)
+        self.residues.pop((var1, var2), None)
+        self.residues.pop((var2, var1), None)
+        self.dirty.update((var1, var2))
+        self.changed()
+
+    # removes every constraint between var1 and var2. the last solution stays a solution
+    def remove_constraint(self, var1, var2):
+        self.constraints.remove(var1, var2)
+        self.residues.pop((var1, var2), None)
+        self.residues.pop((var2, var1), None)
+        self.changed()
+
+    # restricts var to a single value until unfixed
+    def fix(self, var, value):
+        self.fixes[var] = value
+        self.dirty.add(var)
+        self.changed()
+
+    # lets var take the values it could at construction again. the last solution stays a solution
+    def unfix(self, var):
+        self.fixes.pop(var, None)
+        self.changed()
+
+    # forgets what was worked out from the constraints and domains before they changed
+    def changed(self):
+        self.interchangeable = self.detect_value_symmetry()
+        self.problem_fingerprint = None
+
+    # solves again after constraints or domains changed, starting from the last solution. only variables whose
+    # constraints or domains were tightened since are checked, and if some conflict, up to repair_steps
+    # single-variable moves try to fix the conflicts locally. if that fails too, backtrack search with given
+    # options runs, trying the values of the last solution first. variables fixed by the options hold for the
+    # repair too, and are checked like tightened ones. returns the assignment, or None if there is no solution
+    def resolve(self, mrv, lcv, infer, repair_steps=1000, **options):
+        if self.last_solution is not None:
+            solution = list(self.last_solution)
+            self.reset_domains()
+            fixed = options.get("fixed")
+            if fixed:
+                for var in fixed.keys():
+                    self.domains.assign(var, fixed[var])
+                self.dirty.update(fixed.keys())
+            if self.repair(solution, repair_steps):
+                self.stats = SearchStats()
+                self.stats.nodes = len(self.dirty)
+                for i in range(self.assignment_length):
+                    self.assignment[i] = solution[i]
+                self.last_solution = solution
+                self.dirty = set()
+                return self.assignment
+            self.preferred = self.last_solution
+
+        try:
+            return self.backtrack_search(mrv, lcv, infer, **options)
+        finally:
+            self.preferred = None
+
+    # moves conflicting variables of given complete assignment, starting from the dirty ones, each to the
+    # value in its domain conflicting with the fewest others and otherwise keeping its value, then checks
+    # the variables it still conflicts with. returns true if no conflicts are left within max_steps moves
+    def repair(self, solution, max_steps):
+        queue = list(self.dirty)
+        queued = set(queue)
+        steps = 0
+        while queue:
+            var = queue.pop()
+            queued.discard(var)
+            if self.domains.contains(var, solution[var]) and self.constraints.is_consistent(solution, var):
+                continue
+            if steps == max_steps:
+                return False
+            steps += 1
+
+            best = None
+            best_conflict = None
+            for value in [solution[var]] + self.domains.values(var):
+                if not self.domains.contains(var, value):
+                    continue
+                solution[var] = value
+                conflict = self.constraints.conflict_set(solution, var)
+                if best_conflict is None or len(conflict) < len(best_conflict):
+                    best, best_conflict = value, conflict
+            if best is None:    # empty domain
                 return False
+
+            solution[var] = best
+            for other in best_conflict:
+                if other not in queued:
+                    queue.append(other)
+                    queued.add(other)
         return True
 
+    # returns set of assigned variables responsible for values missing from the domain of var. forward
+    # checking records exactly which variable pruned what, after mac every earlier decision may be involved
+    def removal_explanation(self, var, infer):
+        if infer:
+            return set(self.decisions)
+        return set(self.pruned_by[var])
+
+    # returns set of assigned variables responsible for the domain wipeout right after assigning var
+    def wipeout_explanation(self, var, infer):
+        if infer:
+            return set(self.decisions)
+        conflict = set(self.pruned_by[self.wiped_out])
+        conflict.add(var)
+        return conflict
+
     # returns next variable
     def no_variable_heuristic(self):
         for i in range(self.assignment_length):
@@ -101,94 +376,167 @@ class ConstraintSatisfactionProblem:
                 #return range(i, self.assignment_length)
         return 0
 
-    # returns variable based on minimum remaining values
+    # returns unassigned variable with the fewest values left in its domain, and of those the one sharing
+    # constraints with the most other variables, from the variable heap kept up to date by the domain store
     def mrv_heuristic(self):
-
-        min_remaining = (None, float('-inf'))
-        # iterate through unassigned variables
-        for i in range(self.assignment_length):
-            if self.assignment[i] is None:
-                temp = self.constraints.possible_count(self.assignment, i)
-                # if more constraining than previous most constraining, it is the new most constraint
-                if temp > min_remaining[1]:
-                    min_remaining = (i, temp)
-
-        return min_remaining[0]
-
-    # returns values based on least constrained value
+        return self.variable_heap.peek()
+
+    # returns unassigned variable with the smallest ratio of domain size to weighted degree, the sum of the
+    # weights of its constraints with other unassigned variables, so variables involved in many failures so
+    # far come first. ties are broken at random when seeded. read from the weighted degree heap, which is kept
+    # up to date as the search assigns variables and bumps weights
+    def wdeg_heuristic(self):
+        return self.weight_heap.peek()
+
+    # adds 1 to the weight of the binary constraint on given arc
+    def bump_arc(self, arc):
+        key = (min(arc), max(arc))
+        self.arc_weights[key] = self.arc_weights.get(key, 1) + 1
+        if self.weight_heap is not None:
+            self.weight_heap.bump_arc(key)
+
+    # adds 1 to the weight of global constraint g
+    def bump_global(self, g):
+        self.global_weights[g] += 1
+        if self.weight_heap is not None:
+            self.weight_heap.bump_global(g)
+
+    # returns values left in the domain of var, the ones ruling out the fewest values of its neighbors first,
+    # using conflict counts that SupportCounts brings up to date when var is ordered
     def lcv_heuristic(self, var):
+        # values in random order when seeded, so equally constraining values are tried in random order
+        values = self.domains.values(var)
+        if self.random is not None:
+            self.random.shuffle(values)
+        return self.support_counts.order(values, var)
+
+    # removes values from the domains of unassigned neighbors of var that conflict with its value, adding
+    # each pruned neighbor to pruned and recording var as the cause, returns false if some domain becomes
+    # empty, with that variable left in self.wiped_out
+    def forward_check(self, var, pruned=None):
+        if pruned is None:
+            pruned = []
+        for arc in self.constraints.unassigned_neighbors(self.assignment, var):
+            if self.mac_revise(arc):
+                self.pruned_by[arc[0]].append(var)
+                pruned.append(arc[0])
+                if self.domains.size(arc[0]) == 0:
+                    self.wiped_out = arc[0]
+                    self.bump_arc(arc)
+                    return False
+        for g in self.constraints.globals_of.get(var, ()):
+            mark = self.domains.mark()
+            revised = self.constraints.global_constraints[g].forward_check(self.assignment, self.domains, var)
+            self.count_global_revision(mark)
+            if revised is None:
+                for neighbor in self.constraints.global_constraints[g].variables:
+                    if self.domains.size(neighbor) == 0:
+                        self.wiped_out = neighbor
+                self.bump_global(g)
+                return False
+            for neighbor in revised:
+                self.pruned_by[neighbor].append(var)
+                pruned.append(neighbor)
+        return True
 
-        tuple_list = []
-        domain_list = []
-
-        # iterate through each possible value
-        for i in range(self.domain_length):
-            lc_val = self.constraints.constrain_count(self.assignment, var, i)
-
-            #print("*", lc_val)
-
-            # find correct index to insert
-            j = 0
-            index = 0
-            while j < len(tuple_list):
-                if tuple_list[j][1] < lc_val[1]:
-                    index += 1
-                j += 1
-            tuple_list.insert(index, lc_val)
-
-        for i in range(len(tuple_list)):
-            domain_list.append(tuple_list[i][0])
-
-        #print("domain list:",domain_list, "\n")
-        return domain_list
-
-    # mac-3 inference
+    # mac-3 inference, returns false if some domain becomes empty
     def mac_infer(self, var):
-        # dictionary mapping unassigned var ints to set of values that they cannot be:
-        inconsistencies = {}
-        queue = []
-
-        # add all arcs with with one unassinged variables and given variable in them
-        for initial in self.constraints.unassigned_neighbors(self.assignment, var):
-            queue.append(initial)
-
-        while queue:    # iterate through arcs
-            arc = queue.pop()
-            temp = self.mac_revise(arc, inconsistencies)
-
-            # occurs when no possible value for some variable, means this tree is bad
-            if temp is None:
-                return None
-
-            # add inconsistencies if found
-            inconsistencies[arc[0]] = temp
-
-        #print("inconsistencies:", inconsistencies)
-        return inconsistencies
-
-    # determines if arc is an inconsistency
-    def mac_revise(self, arc, inconsistencies):
-        # set of all values var1 and var2 cannot be
-        revised = set()
-        if arc[0] in inconsistencies.keys():
-            revised = inconsistencies[arc[0]]
-
-        constraints = self.constraints.get_constraints(arc[0], arc[1])
-        #print("constraints:",constraints)
-        if constraints is None:
-            return None
+        return self.arc_consistency(self.constraints.unassigned_neighbors(self.assignment, var), [var])
+
+    # ac-3 over given arcs, plus propagation of global constraints on given changed variables. arcs and global
+    # constraints are added back into the queues whenever a domain shrinks, binary arcs are processed first
+    # since they are cheaper
+    def arc_consistency(self, arcs, changed=()):
+        queue = list(arcs)
+        queued = set(queue)
+        global_queue = []
+        global_queued = set()
+
+        for var in changed:
+            self.schedule_globals(var, global_queue, global_queued)
+
+        while queue or global_queue:
+            if queue:   # iterate through arcs
+                arc = queue.pop()
+                queued.discard(arc)
+
+                if self.mac_revise(arc):
+                    # occurs when no possible value for some variable, means this tree is bad
+                    if self.domains.size(arc[0]) == 0:
+                        self.bump_arc(arc)
+                        return False
+
+                    # domain of arc[0] changed, so its other unassigned neighbors need rechecking
+                    self.schedule_arcs(arc[0], arc[1], queue, queued)
+                    self.schedule_globals(arc[0], global_queue, global_queued)
+
+            else:
+                g = global_queue.pop()
+                global_queued.discard(g)
+
+                mark = self.domains.mark()
+                revised = self.constraints.global_constraints[g].propagate(self.domains)
+                self.count_global_revision(mark)
+                if revised is None:
+                    self.bump_global(g)
+                    return False
+                for var in revised:
+                    self.schedule_arcs(var, None, queue, queued)
+                    self.schedule_globals(var, global_queue, global_queued, g)
 
-        # iterate through assignment, looking for inconsistencies
-        for x in range(self.domain_length):
-            cannot = 0
-            for y in range(self.domain_length):
-                if (x, y) not in constraints:
-                    cannot += 1
-            if cannot == self.domain_length:
-                revised.add(x)
-
-        # no possible values, bad decision in past
-        if len(revised) == self.domain_length:
-            return None
+        return True
 
-        return revised
+    # counts a global constraint propagation as a revision, and the values it removed from the domains since
+    # given marker as prunings
+    def count_global_revision(self, mark):
+        self.stats.revisions += 1
+        for i in range(mark, len(self.domains.trail)):
+            self.stats.prunings += self.domains.trail[i][1].bit_count()
+
+    # adds arcs from unassigned neighbors of var, other than skip, to the arc queue
+    def schedule_arcs(self, var, skip, queue, queued):
+        for neighbor in self.constraints.neighbors.get(var, ()):
+            new_arc = (neighbor, var)
+            if neighbor != skip and self.assignment[neighbor] is None and new_arc not in queued:
+                queue.append(new_arc)
+                queued.add(new_arc)
+
+    # adds global constraints containing var, other than skip, to the global queue
+    def schedule_globals(self, var, global_queue, global_queued, skip=None):
+        for g in self.constraints.globals_of.get(var, ()):
+            if g != skip and g not in global_queued:
+                global_queue.append(g)
+                global_queued.add(g)
+
+    # ac-3rm revise: removes values of arc[0] with no support left in the domain of arc[1], returns true if
+    # any were removed. the last support found for each value is kept as a residue and only when it has
+    # been removed from the domain of arc[1] is the relation row checked again
+    def mac_revise(self, arc):
+        relation = self.constraints.get_constraints(arc[0], arc[1])
+        if relation is None:
+            return False
+
+        residues = self.residues.get(arc)
+        if residues is None:
+            residues = self.residues[arc] = {}
+
+        target = self.domains.domains[arc[1]]
+        removed = 0
+        for x in self.domains.values(arc[0]):
+            residue = residues.get(x)
+            if residue is not None and (target >> residue) & 1:
+                continue
+
+            # residue gone, look for a new support
+            support = relation.first_support(x, target)
+            if support is not None:
+                residues[x] = support
+            else:
+                removed |= 1 << x
+
+        self.stats.revisions += 1
+        if removed:
+            self.domains.remove(arc[0], removed)
+            self.stats.prunings += removed.bit_count()
+            return True
+        return False
@@ -0,0 +1,167 @@
+# knuth's algorithm x over a sparse 0/1 matrix stored as dancing links: circular doubly linked lists in both
+# directions, kept in flat lists, where covering and uncovering a column is a handful of pointer updates.
+# primary columns must be covered exactly once, secondary columns at most once
+class DancingLinks:
+    def __init__(self, primary_count, secondary_count=0):
+        self.primary_count = primary_count          # number of columns that must be covered
+        self.column_count = primary_count + secondary_count
+
+        # node 0 is the root, nodes 1..column_count are column headers, then one node per 1 in the matrix
+        headers = self.column_count + 1
+        self.left = list(range(-1, headers - 1))
+        self.right = list(range(1, headers + 1))
+        self.up = list(range(headers))
+        self.down = list(range(headers))
+        self.column = list(range(headers))
+        self.row_of = [None] * headers      # row index of every node
+        self.size = [0] * headers           # number of nodes in every column
+
+        # only primary columns are linked to the root, so search never picks a secondary one
+        self.left[0] = primary_count
+        self.right[primary_count] = 0
+        for c in range(primary_count + 1, headers):
+            self.left[c] = c
+            self.right[c] = c
+
+        self.row_count = 0
+        self.updates = 0    # number of nodes unlinked by the last search
+
+    # adds a row with a 1 in every given column, returns its index
+    def add_row(self, columns):
+        row = self.row_count
+        self.row_count += 1
+
+        first = None
+        for col in columns:
+            c = col + 1
+            node = len(self.column)
+            self.column.append(c)
+            self.row_of.append(row)
+
+            # link at the bottom of the column
+            self.up.append(self.up[c])
+            self.down.append(c)
+            self.down[self.up[c]] = node
+            self.up[c] = node
+            self.size[c] += 1
+
+            # link at the end of the row
+            if first is None:
+                first = node
+                self.left.append(node)
+                self.right.append(node)
+            else:
+                self.left.append(self.left[first])
+                self.right.append(first)
+                self.right[self.left[first]] = node
+                self.left[first] = node
+
+        return row
+
+    # removes column c from the header list, and every row with a 1 in c from the other columns
+    def cover(self, c):
+        left, right, up, down = self.left, self.right, self.up, self.down
+        right[left[c]] = right[c]
+        left[right[c]] = left[c]
+        i = down[c]
+        while i != c:
+            j = right[i]
+            while j != i:
+                down[up[j]] = down[j]
+                up[down[j]] = up[j]
+                self.size[self.column[j]] -= 1
+                self.updates += 1
+                j = right[j]
+            i = down[i]
+
+    # exactly undoes cover(c)
+    def uncover(self, c):
+        left, right, up, down = self.left, self.right, self.up, self.down
+        i = up[c]
+        while i != c:
+            j = left[i]
+            while j != i:
+                self.size[self.column[j]] += 1
+                down[up[j]] = j
+                up[down[j]] = j
+                j = left[j]
+            i = up[i]
+        right[left[c]] = c
+        left[right[c]] = c
+
+    # covers every other column of the row containing node r
+    def select(self, r):
+        j = self.right[r]
+        while j != r:
+            self.cover(self.column[j])
+            j = self.right[j]
+
+    # exactly undoes select(r)
+    def deselect(self, r):
+        j = self.left[r]
+        while j != r:
+            self.uncover(self.column[j])
+            j = self.left[j]
+
+    # returns uncovered primary column with fewest rows, or None if every primary column is covered
+    def choose_column(self):
+        best = None
+        c = self.right[0]
+        while c != 0:
+            if best is None or self.size[c] < self.size[best]:
+                best = c
+                if self.size[c] == 0:
+                    break
+            c = self.right[c]
+        return best
+
+    # generator of every exact cover, each as a list of row indices. uses an explicit stack of chosen rows
+    # rather than recursion, and leaves the matrix as it was even when not run to the end
+    def search(self):
+        self.updates = 0
+        c = self.choose_column()
+        if c is None:
+            yield []
+            return
+
+        self.cover(c)
+        r = self.down[c]
+        stack = []      # (column, row node) for every row chosen so far
+        done = False
+        try:
+            while True:
+                if r != c:
+                    self.select(r)
+                    next_column = self.choose_column()
+                    if next_column is None:     # every primary column covered
+                        solution = [self.row_of[node] for (column, node) in stack]
+                        solution.append(self.row_of[r])
+                        self.deselect(r)
+                        r = self.down[r]
+                        yield solution
+                    else:
+                        stack.append((c, r))
+                        c = next_column
+                        self.cover(c)
+                        r = self.down[c]
+                else:   # no rows left for column c, go back to the previous choice
+                    self.uncover(c)
+                    if not stack:
+                        done = True
+                        return
+                    c, r = stack.pop()
+                    self.deselect(r)
+                    r = self.down[r]
+        finally:
+            if not done:
+                self.uncover(c)
+                while stack:
+                    c, r = stack.pop()
+                    self.deselect(r)
+                    self.uncover(c)
+
+    # returns first exact cover found as a list of row indices, or None if there is none
+    def solve(self):
+        for solution in self.search():
+            return solution
+        return None
@@ -0,0 +1,301 @@
+import queue
+
+from Portfolio import process_context
+from SearchStats import SearchStats
+
+
+# splits the constraint graph of given CSP into connected components and solves each on its own, so a failure
+# in one never causes search in another. components without global constraints that become a forest once a
+# cycle cutset of at most cutset_limit variables is removed are solved by trying the consistent values of the
+# cutset and solving each tree left with directional arc consistency, trees themselves having an empty
+# cutset. every other component is solved by backtrack search with given heuristics and options. with more
+# than one worker, components are shared out between that many processes. values fixed by the options hold in
+# every component. leaves the solution in the CSP assignment and returns it, or None if some component has no
+# solution
+def decomposed_search(csp, mrv, lcv, infer, workers=1, cutset_limit=8, **options):
+    csp.stats = SearchStats()
+    for i in range(csp.assignment_length):
+        csp.assignment[i] = None
+    csp.reset_domains()
+    fixed = options.pop("fixed", None)
+    if fixed is None:
+        fixed = {}
+    for var in fixed.keys():
+        csp.domains.assign(var, fixed[var])
+
+    components = connected_components(csp.constraints, range(csp.assignment_length))
+    if workers > 1 and len(components) > 1:
+        solved = solve_in_parallel(csp, components, mrv, lcv, infer, workers, cutset_limit, fixed,
+                                   options)
+    else:
+        solved = True
+        for component in components:
+            if not solve_component(csp, component, mrv, lcv, infer, cutset_limit, fixed, options):
+                solved = False
+                break
+
+    if not solved:
+        for i in range(csp.assignment_length):
+            csp.assignment[i] = None
+        return None
+    return csp.assignment
+
+
+# returns list of connected components, each a list of variables, of the constraint graph restricted to
+# given variables. variables of a global constraint are all connected to each other
+def connected_components(constraints, variables):
+    remaining = set(variables)
+    components = []
+    for start in variables:
+        if start not in remaining:
+            continue
+        remaining.discard(start)
+        component = [start]
+        stack = [start]
+        while stack:
+            var = stack.pop()
+            for other in adjacent(constraints, var):
+                if other in remaining:
+                    remaining.discard(other)
+                    component.append(other)
+                    stack.append(other)
+        components.append(component)
+    return components
+
+
+# generator of every variable sharing a binary or global constraint with var
+def adjacent(constraints, var):
+    for neighbor in constraints.neighbors.get(var, ()):
+        yield neighbor
+    for g in constraints.globals_of.get(var, ()):
+        for other in constraints.global_constraints[g].variables:
+            if other != var:
+                yield other
+
+
+# returns list of variables whose removal leaves the binary constraint graph of given component a forest,
+# empty if it is already a tree, or None if more than limit would be needed. variables with at most one
+# neighbor left are removed for free, since they can't be on a cycle, and when none are left the variable
+# with most neighbors goes into the cutset
+def cycle_cutset(constraints, component, limit):
+    alive = set(component)
+    degree = {}
+    leaves = []
+    for var in component:
+        degree[var] = len(alive.intersection(constraints.neighbors.get(var, ())))
+        if degree[var] <= 1:
+            leaves.append(var)
+
+    cutset = []
+    while True:
+        while leaves:
+            var = leaves.pop()
+            if var in alive:
+                remove_vertex(constraints, var, alive, degree, leaves)
+        if not alive:
+            return cutset
+
+        if len(cutset) == limit:
+            return None
+        var = max(alive, key=degree.get)
+        cutset.append(var)
+        remove_vertex(constraints, var, alive, degree, leaves)
+
+
+# removes var from the graph of alive variables, adding neighbors left with at most one neighbor to leaves
+def remove_vertex(constraints, var, alive, degree, leaves):
+    alive.discard(var)
+    for neighbor in constraints.neighbors.get(var, ()):
+        if neighbor in alive:
+            degree[neighbor] -= 1
+            if degree[neighbor] <= 1:
+                leaves.append(neighbor)
+
+
+# solves one component in the CSP, with given dictionary of fixed values already applied to its domains.
+# returns true if it has a solution, left in the CSP assignment
+def solve_component(csp, component, mrv, lcv, infer, cutset_limit, fixed, options):
+    if not any(var in csp.constraints.globals_of for var in component):
+        cutset = cycle_cutset(csp.constraints, component, cutset_limit)
+        if cutset is not None:
+            forest = [var for var in component if var not in cutset]
+            trees = connected_components(csp.constraints, forest)
+            return condition(csp, cutset, trees, 0)
+
+    sub_csp, variables = sub_problem(csp, component)
+    sub_fixed = {}     # fixed values by their number in the component
+    for i in range(len(variables)):
+        if variables[i] in fixed:
+            sub_fixed[i] = fixed[variables[i]]
+    solution = sub_csp.backtrack_search(mrv, lcv, infer, fixed=sub_fixed, **options)
+    csp.stats.add(sub_csp.stats)
+    if solution is None:
+        return False
+    for i in range(len(variables)):
+        csp.assignment[variables[i]] = solution[i]
+    return True
+
+
+# tries every consistent assignment of the cutset variables from index on, forward checking their neighbors,
+# until the trees left can all be solved. returns true if they were, with the solution in the CSP assignment
+def condition(csp, cutset, trees, index):
+    domains = csp.domains
+    if index == len(cutset):
+        mark = domains.mark()
+        for tree in trees:
+            if not solve_tree(csp, tree):
+                domains.undo(mark)
+                for other in trees:
+                    for var in other:
+                        csp.assignment[var] = None
+                return False
+        return True
+
+    var = cutset[index]
+    for value in domains.values(var):
+        csp.assignment[var] = value
+        if not csp.constraints.is_consistent(csp.assignment, var):
+            csp.stats.fails += 1
+            continue
+
+        csp.stats.nodes += 1
+        mark = domains.mark()
+        domains.assign(var, value)
+        if forward_check(csp, var) and condition(csp, cutset, trees, index + 1):
+            return True
+        csp.stats.fails += 1
+        domains.undo(mark)
+
+    csp.assignment[var] = None
+    csp.stats.backtracks += 1
+    return False
+
+
+# removes values conflicting with the value of var from the domains of its unassigned neighbors, including
+# those in global constraints, returns false if some domain becomes empty
+def forward_check(csp, var):
+    for arc in csp.constraints.unassigned_neighbors(csp.assignment, var):
+        csp.mac_revise(arc)
+        if csp.domains.size(arc[0]) == 0:
+            return False
+    for g in csp.constraints.globals_of.get(var, ()):
+        if csp.constraints.global_constraints[g].forward_check(csp.assignment, csp.domains, var) is None:
+            return False
+    return True
+
+
+# solves given tree of variables, connected only by binary constraints, in time linear in its size: makes
+# every parent arc consistent with its children, from the leaves up, after which every value left has a
+# support in each child, so values can be chosen from the root down without ever backtracking. returns true
+# if the tree has a solution, left in the CSP assignment, otherwise some domains may have been pruned
+def solve_tree(csp, tree):
+    members = set(tree)
+    parent = {tree[0]: None}
+    order = [tree[0]]   # breadth first, so every parent comes before its children
+    for var in order:
+        for neighbor in csp.constraints.neighbors.get(var, ()):
+            if neighbor in members and neighbor not in parent:
+                parent[neighbor] = var
+                order.append(neighbor)
+
+    # directional arc consistency, children before parents
+    for var in reversed(order):
+        if csp.domains.size(var) == 0:
+            return False
+        if parent[var] is not None:
+            csp.mac_revise((parent[var], var))
+
+    for var in order:
+        if parent[var] is None:
+            mask = csp.domains.domains[var]
+            csp.assignment[var] = (mask & -mask).bit_length() - 1
+        else:
+            relation = csp.constraints.get_constraints(parent[var], var)
+            csp.assignment[var] = relation.first_support(csp.assignment[parent[var]], csp.domains.domains[var])
+        csp.stats.nodes += 1
+    return True
+
+
+# returns a new CSP of the same class over just the variables of given component, numbered in order, and
+# the list of original variables
+def sub_problem(csp, component):
+    index = {}
+    for i in range(len(component)):
+        index[component[i]] = i
+
+    constraints = {}
+    for (i, j) in csp.constraints.constraints.keys():
+        if i in index and j in index:
+            constraints[(index[i], index[j])] = csp.constraints.constraints[(i, j)]
+
+    restricted = csp.restricted_domains()
+    domains = {}
+    for var in component:
+        if var in restricted:
+            domains[index[var]] = restricted[var]
+
+    global_constraints = []
+    for constraint in csp.constraints.global_constraints:
+        if constraint.variables[0] in index:
+            global_constraints.append(type(constraint)([index[var] for var in constraint.variables]))
+
+    sub_csp = type(csp)(len(component), csp.domain_length, constraints, domains, global_constraints)
+    for group in csp.symmetric_variables:
+        members = [index[var] for var in group if var in index]
+        if len(members) > 1:
+            sub_csp.symmetric_variables.append(members)
+    return sub_csp, component
+
+
+# solves components across worker processes, each taking every workers-th one, and stops them all as soon
+# as one component turns out to have no solution. returns true if every component was solved, raises
+# RuntimeError if a worker exited with an error
+def solve_in_parallel(csp, components, mrv, lcv, infer, workers, cutset_limit, fixed, options):
+    context = process_context()
+    results = context.Queue()
+
+    processes = []
+    for i in range(workers):
+        process = context.Process(target=work, args=(csp, components[i::workers], mrv, lcv, infer,
+                                                     cutset_limit, fixed, options, results))
+        process.daemon = True
+        process.start()
+        processes.append(process)
+
+    solved = True
+    try:
+        received = 0
+        while received < workers:
+            try:
+                solution, stats = results.get(timeout=0.05)
+            except queue.Empty:
+                # a worker that exited normally has put its result, so only ones with an error never will
+                for process in processes:
+                    if process.exitcode not in (None, 0):
+                        raise RuntimeError("decomposition worker exited with code {:d}".format(process.exitcode))
+                continue
+            received += 1
+            csp.stats.add(stats)
+            if solution is None:
+                solved = False
+                break
+            for var in solution.keys():
+                csp.assignment[var] = solution[var]
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+    return solved
+
+
+# worker process: solves given components and puts (dictionary of their values or None, stats) on results
+def work(csp, components, mrv, lcv, infer, cutset_limit, fixed, options, results):
+    solution = {}
+    for component in components:
+        if not solve_component(csp, component, mrv, lcv, infer, cutset_limit, fixed, options):
+            solution = None
+            break
+        for var in component:
+            solution[var] = csp.assignment[var]
+    results.put((solution, csp.stats))
@@ -0,0 +1,72 @@
+# current domain of every variable, stored as a bitset per variable, plus a trail of removals so that
+# backtracking can undo exactly what was removed since some earlier point in the search
+class DomainStore:
+    def __init__(self, variable_count, domain_length):
+        self.variable_count = variable_count    # int corresponding to number of variables
+        self.domain_length = domain_length      # int corresponding to number of entries in domain
+
+        full = (1 << domain_length) - 1
+        self.domains = [full] * variable_count          # bit i set means value i is still possible
+        self.sizes = [domain_length] * variable_count   # number of set bits in each domain
+        self.trail = []                                 # list of (var, removed bits) tuples
+        self.listeners = []                             # functions called with var when its domain changes
+
+    # returns true if value is still in the domain of var
+    def contains(self, var, value):
+        return (self.domains[var] >> value) & 1 == 1
+
+    # returns number of values left in the domain of var
+    def size(self, var):
+        return self.sizes[var]
+
+    # returns list of values left in the domain of var, in increasing order
+    def values(self, var):
+        return bits_to_values(self.domains[var])
+
+    # removes every value in mask from the domain of var, returns number of values left
+    def remove(self, var, mask):
+        removed = self.domains[var] & mask
+        if removed:
+            self.domains[var] ^= removed
+            self.sizes[var] -= removed.bit_count()
+            self.trail.append((var, removed))
+            for listener in self.listeners:
+                listener(var)
+        return self.sizes[var]
+
+    # removes a single value from the domain of var, returns number of values left
+    def remove_value(self, var, value):
+        return self.remove(var, 1 << value)
+
+    # reduces the domain of var to just value
+    def assign(self, var, value):
+        return self.remove(var, self.domains[var] & ~(1 << value))
+
+    # adds function to be called as listener(var) whenever the domain of var shrinks or is restored
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    # returns a marker for the current state, to undo back to later
+    def mark(self):
+        return len(self.trail)
+
+    # restores every removal made since given marker, in reverse order
+    def undo(self, mark):
+        trail = self.trail
+        listeners = self.listeners
+        while len(trail) > mark:
+            var, removed = trail.pop()
+            self.domains[var] |= removed
+            self.sizes[var] += removed.bit_count()
+            for listener in listeners:
+                listener(var)
+
+
+# returns list of values whose bits are set in mask, in increasing order
+def bits_to_values(mask):
+    values = []
+    while mask:
+        low = mask & -mask
+        values.append(low.bit_length() - 1)
+        mask ^= low
+    return values
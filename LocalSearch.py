@@ -0,0 +1,150 @@
+import random
+
+from Relation import NotEqual
+
+
+# min-conflicts local search with a tabu list. starts from a complete assignment and repeatedly moves a
+# variable in conflict to the value with fewest conflicts. conflict counts for every (variable, value) pair
+# are kept up to date as neighbors move, so each step only touches the moved variable's neighbors
+class MinConflicts:
+    def __init__(self, csp, tabu_tenure=10, seed=None):
+        self.csp = csp                  # ConstraintSatisfactionProblem being searched
+        self.tabu_tenure = tabu_tenure  # number of steps a variable may not return to a value it just left
+        self.random = random.Random(seed)
+
+        csp.reset_domains()
+        n = csp.assignment_length
+        self.values = [csp.domains.values(var) for var in range(n)]
+        self.full = [csp.domains.domains[var] for var in range(n)]
+
+        # list of (neighbor, relation from var to neighbor) for every variable, with the variables of global
+        # constraints treated as pairwise not equal
+        self.neighbors = [[] for var in range(n)]
+        for (i, j) in csp.constraints.constraints.keys():
+            self.neighbors[i].append((j, csp.constraints.constraints[(i, j)]))
+        not_equal = NotEqual()
+        for g in csp.constraints.global_constraints:
+            for i in g.variables:
+                for j in g.variables:
+                    if i != j:
+                        self.neighbors[i].append((j, not_equal))
+
+        self.steps = 0
+
+    # runs up to restarts + 1 attempts of max_steps steps each, leaving the solution in the CSP assignment,
+    # returns true if one was found
+    def run(self, max_steps, restarts=0):
+        for attempt in range(restarts + 1):
+            if attempt > 0:
+                self.csp.stats.restarts += 1
+            self.initialize()
+            if self.search(max_steps):
+                for var in range(self.csp.assignment_length):
+                    self.csp.assignment[var] = self.assignment[var]
+                return True
+
+        for var in range(self.csp.assignment_length):
+            self.csp.assignment[var] = None
+        return False
+
+    # builds a random complete assignment, its conflict counts and the list of variables in conflict
+    def initialize(self):
+        n = self.csp.assignment_length
+        self.assignment = [None] * n
+        self.conflicts = [[0] * self.csp.domain_length for var in range(n)]
+        self.tabu = [[] for var in range(n)]    # per variable, list of (value, step until which var may not
+                                                # take it), expired pairs dropped whenever var moves
+
+        for var in range(n):
+            if not self.values[var]:    # empty domain, no solution
+                self.assignment[var] = None
+                continue
+            value = self.random.choice(self.values[var])
+            self.assignment[var] = value
+            self.add_conflicts(var, value, 1)
+
+        self.conflicted = []    # variables whose current value has conflicts
+        self.position = {}      # variable -> index in self.conflicted
+        for var in range(n):
+            self.update_conflicted(var)
+
+    # adds sign to the conflict count of every neighbor value that conflicts with var being value
+    def add_conflicts(self, var, value, sign):
+        for (neighbor, relation) in self.neighbors[var]:
+            counts = self.conflicts[neighbor]
+            conflicting = self.full[neighbor] & ~relation.supports(value, self.full[neighbor])
+            while conflicting:
+                low = conflicting & -conflicting
+                counts[low.bit_length() - 1] += sign
+                conflicting ^= low
+
+    # adds or removes var from the list of variables in conflict, as needed
+    def update_conflicted(self, var):
+        value = self.assignment[var]
+        in_conflict = value is None or self.conflicts[var][value] > 0
+        if in_conflict and var not in self.position:
+            self.position[var] = len(self.conflicted)
+            self.conflicted.append(var)
+        elif not in_conflict and var in self.position:
+            # swap with the last one so removal is constant time
+            index = self.position.pop(var)
+            last = self.conflicted.pop()
+            if last != var:
+                self.conflicted[index] = last
+                self.position[last] = index
+
+    # makes up to max_steps moves, returns true once no variable is in conflict
+    def search(self, max_steps):
+        for step in range(max_steps):
+            if not self.conflicted:
+                return True
+            self.steps += 1
+            self.csp.stats.nodes += 1
+
+            var = self.conflicted[self.random.randrange(len(self.conflicted))]
+            if self.assignment[var] is None:    # empty domain
+                return False
+            value = self.choose_value(var)
+            if value is not None:
+                self.move(var, value)
+
+        return not self.conflicted
+
+    # returns value of var with fewest conflicts, ties broken at random, skipping tabu values unless they
+    # remove every conflict of var
+    def choose_value(self, var):
+        current = self.assignment[var]
+        counts = self.conflicts[var]
+        tabu = [value for (value, expiry) in self.tabu[var] if expiry >= self.steps]
+        best = []
+        best_count = None
+        for value in self.values[var]:
+            if value == current:
+                continue
+            count = counts[value]
+            if count > 0 and value in tabu:
+                continue
+            if best_count is None or count < best_count:
+                best = [value]
+                best_count = count
+            elif count == best_count:
+                best.append(value)
+
+        if not best:
+            return None
+        return self.random.choice(best)
+
+    # changes the value of var, updating conflict counts of its neighbors and which variables are in conflict
+    def move(self, var, value):
+        old = self.assignment[var]
+        self.add_conflicts(var, old, -1)
+        self.add_conflicts(var, value, 1)
+        self.assignment[var] = value
+        # a variable holds at most tabu_tenure unexpired pairs, so memory doesn't grow with the number of steps
+        self.tabu[var] = [(tabu_value, expiry) for (tabu_value, expiry) in self.tabu[var]
+                          if expiry >= self.steps and tabu_value != old]
+        self.tabu[var].append((old, self.steps + self.tabu_tenure))
+
+        self.update_conflicted(var)
+        for (neighbor, relation) in self.neighbors[var]:
+            self.update_conflicted(neighbor)
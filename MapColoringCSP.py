@@ -1,6 +1,7 @@
 # Paolo Takagi-Atilano, October 17, 2017
 
 from ConstraintSatisfactionProblem import ConstraintSatisfactionProblem
+from Relation import NotEqual
 
 
 class MapColoringCSP:
@@ -15,24 +16,17 @@ class MapColoringCSP:
         constraints = {}
 
         # two adjacent nodes may not be the same color
-        not_same_color = set()
-        for i in range(len(self.domain)):
-            for j in range(len(self.domain)):
-                if not self.domain[i] == self.domain[j]:
-                    not_same_color.add((i, j))
+        not_same_color = NotEqual()
+
+        # index of every node, so edges don't need to search the list of variables
+        index = {}
+        for i in range(len(self.variables)):
+            index[self.variables[i]] = i
 
         # iterate through each edge
         for i in range(len(edges)):
-
-            # find index of one node in edge
-            a = 0
-            while self.variables[a] != edges[i][0]:
-                a = a + 1
-
-            # find index of other node in edge
-            b = 0
-            while self.variables[b] != edges[i][1]:
-                b = b + 1
+            a = index[edges[i][0]]
+            b = index[edges[i][1]]
 
             # add set of constraints for edge to constraints dictionary
             constraints[(a, b)] = not_same_color
@@ -40,15 +34,58 @@ class MapColoringCSP:
 
         return constraints
 
-    # backtrack search
-    def backtrack_search(self, mrv, lcv, inference):
+    # backtrack search, options are passed on to the CSP search
+    def backtrack_search(self, mrv, lcv, inference, **options):
+        self.CSP.backtrack_search(mrv, lcv, inference, **options)
+        return self.solution_to_str() + '\n        ' + str(self.CSP.fails) + " fails"
+
+    # backtrack search, served from given SolutionCache when the same problem was solved before, see
+    # ConstraintSatisfactionProblem.cached_search
+    def cached_search(self, cache, mrv, lcv, inference, **options):
+        self.CSP.cached_search(cache, mrv, lcv, inference, **options)
+        return self.solution_to_str() + '\n        ' + str(self.CSP.fails) + " fails"
+
+    # runs several search configurations in parallel and keeps the first to finish, see
+    # Portfolio.portfolio_search, and returns output plus some syntax
+    def portfolio_search(self, configurations=None, workers=None, timeout=None):
+        self.CSP.portfolio_search(configurations, workers, timeout)
+        return self.solution_to_str() + '\n        ' + str(self.CSP.fails) + " fails"
+
+    # solves every island of the map on its own, see ConstraintSatisfactionProblem.decomposed_search
+    def decomposed_search(self, mrv, lcv, inference, workers=1, cutset_limit=8, **options):
+        self.CSP.decomposed_search(mrv, lcv, inference, workers, cutset_limit, **options)
+        return self.solution_to_str() + '\n        ' + str(self.CSP.fails) + " fails"
+
+    # min-conflicts local search, for maps too large for backtrack search, see
+    # ConstraintSatisfactionProblem.min_conflicts_search
+    def min_conflicts_search(self, max_steps, restarts=0, tabu_tenure=10, seed=None):
+        self.CSP.min_conflicts_search(max_steps, restarts, tabu_tenure, seed)
+        return self.solution_to_str() + '\n        ' + str(self.CSP.stats.nodes) + " steps"
+
+    # makes the two places adjacent, so they may not be the same color
+    def add_edge(self, a, b):
+        self.CSP.add_constraint(self.variables.index(a), self.variables.index(b), NotEqual())
+
+    # makes the two places no longer adjacent
+    def remove_edge(self, a, b):
+        self.CSP.remove_constraint(self.variables.index(a), self.variables.index(b))
+
+    # colors the map again after edges changed, starting from the last coloring, see
+    # ConstraintSatisfactionProblem.resolve
+    def resolve(self, mrv, lcv, inference, repair_steps=1000, **options):
+        self.CSP.resolve(mrv, lcv, inference, repair_steps, **options)
+        return self.solution_to_str() + '\n        ' + str(self.CSP.fails) + " fails"
+
+    # returns CSP assignment with number codes set to corresponding variable name or color name
+    def solution_to_str(self):
         solution = {}
-        self.CSP.backtrack_search(mrv, lcv, inference)
 
-        #print(self.CSP.assignment)
         # sets number codes to corresponding variable name or color name
         for i in range(len(self.CSP.assignment)):
 
-            solution[self.variables[i]] = self.domain[self.CSP.assignment[i]]
+            if self.CSP.assignment[i] is None:     # no solution
+                solution[self.variables[i]] = None
+            else:
+                solution[self.variables[i]] = self.domain[self.CSP.assignment[i]]
 
-        return str(solution) + '\n        ' + str(self.CSP.fails) + " fails"
+        return str(solution)
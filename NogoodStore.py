@@ -0,0 +1,46 @@
+from collections import OrderedDict
+
+
+# bounded store of nogoods, partial assignments known to have no solution, each a frozenset of
+# (variable, value) pairs. when full, the least recently used nogood is evicted
+class NogoodStore:
+    def __init__(self, limit):
+        self.limit = limit              # maximum number of nogoods kept, 0 keeps none
+        self.nogoods = OrderedDict()    # nogood -> set of its variables, in least recently used order
+        self.watches = {}               # (variable, value) -> set of nogoods containing that pair
+
+    # records that the values of given variables in partial assignment can't be part of any solution
+    def add(self, partial_assignment, variables):
+        if self.limit <= 0 or not variables:
+            return
+        nogood = frozenset((var, partial_assignment[var]) for var in variables)
+        if nogood in self.nogoods:
+            self.nogoods.move_to_end(nogood)
+            return
+
+        if len(self.nogoods) >= self.limit:
+            evicted = self.nogoods.popitem(last=False)[0]
+            for pair in evicted:
+                self.watches[pair].discard(evicted)
+                if not self.watches[pair]:
+                    del self.watches[pair]
+
+        self.nogoods[nogood] = set(variables)
+        for pair in nogood:
+            self.watches.setdefault(pair, set()).add(nogood)
+
+    # returns set of the other variables of a nogood that became fully assigned when var was set to value,
+    # or None if there is none
+    def violated(self, partial_assignment, var, value):
+        for nogood in self.watches.get((var, value), ()):
+            matched = True
+            for (other, other_value) in nogood:
+                if partial_assignment[other] != other_value:
+                    matched = False
+                    break
+            if matched:
+                self.nogoods.move_to_end(nogood)
+                variables = set(self.nogoods[nogood])
+                variables.discard(var)
+                return variables
+        return None
@@ -0,0 +1,160 @@
+import os
+import queue
+
+from Portfolio import process_context
+
+
+# splits the search tree of given CSP into subtrees, by fixing the values of the first split_depth variables
+# the search would branch on, and solves them across worker processes. workers that run out of subtrees ask
+# for more, and busy workers hand over the untried values of their shallowest decision. stops every worker
+# as soon as one finds a solution, leaving it in the CSP assignment, and returns the assignment, or None if
+# every subtree was searched without finding one. raises RuntimeError if a worker exited with an error
+# before any solution was found, since the subtrees it held were never searched. values fixed by the options
+# are fixed in every subtree
+def parallel_search(csp, mrv, lcv, infer, workers=None, split_depth=2, steal_interval=100, **options):
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    context = process_context()
+
+    fixed = options.pop("fixed", None)
+    if fixed is None:
+        fixed = {}
+    subtrees = split(csp, mrv, infer, fixed, split_depth, **options)
+
+    tasks = context.Queue()
+    results = context.Queue()
+    outstanding = context.Value("i", len(subtrees))  # subtrees queued or being searched
+    idle = context.Value("i", 0)                    # workers waiting for a subtree
+    stop = context.Event()
+    for fixed in subtrees:
+        tasks.put(fixed)
+
+    processes = []
+    for i in range(workers):
+        process = context.Process(target=work, args=(csp, mrv, lcv, infer, options, steal_interval, tasks,
+                                                     results, outstanding, idle, stop))
+        process.daemon = True
+        process.start()
+        processes.append(process)
+
+    solution = None
+    try:
+        while solution is None:
+            try:
+                solution, stats = results.get(timeout=0.05)
+            except queue.Empty:
+                crashed = [process for process in processes if process.exitcode not in (None, 0)]
+                if crashed or not any(process.is_alive() for process in processes):
+                    # a solution put just before its worker exited may only be readable now
+                    try:
+                        solution, stats = results.get_nowait()
+                    except queue.Empty:
+                        if crashed:
+                            raise RuntimeError("parallel search worker exited with code {:d}".format(
+                                crashed[0].exitcode))
+                    break
+    finally:
+        stop.set()
+        for process in processes:
+            process.join(1)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+
+    for i in range(csp.assignment_length):
+        csp.assignment[i] = None
+    if solution is None:
+        return None
+
+    for i in range(csp.assignment_length):
+        csp.assignment[i] = solution[i]
+    csp.stats = stats
+    return csp.assignment
+
+
+# returns list of dictionaries of fixed values, one per subtree, found by branching on up to depth more
+# variables below the given fixed values, in the order the search itself would choose them. values
+# inconsistent with the fixed ones are skipped, and when the values are interchangeable only one value not
+# used so far is branched on, as the search itself would
+def split(csp, mrv, infer, fixed, depth, **options):
+    engine = csp.start_search(mrv, False, infer, fixed=fixed, **options)
+    if engine.status == "failed":
+        return []
+
+    var = None
+    for i in range(csp.assignment_length):
+        if csp.domains.size(i) > 1 and (var is None or (mrv and csp.domains.size(i) < csp.domains.size(var))):
+            var = i
+    if var is None or depth == 0:
+        return [fixed]
+
+    values = csp.domains.values(var)
+    if engine.uses is not None:
+        values = engine.drop_symmetric(values)  # fixed values count as used, no decision has been made yet
+
+    partial = [None] * csp.assignment_length
+    for other in fixed.keys():
+        partial[other] = fixed[other]
+
+    subtrees = []
+    for value in values:
+        partial[var] = value
+        if not csp.constraints.is_consistent(partial, var):
+            continue
+        branch = dict(fixed)
+        branch[var] = value
+        subtrees.extend(split(csp, mrv, infer, branch, depth - 1, **options))
+    return subtrees
+
+
+# worker process: searches subtrees from tasks until a solution is found or every subtree is done
+def work(csp, mrv, lcv, infer, options, steal_interval, tasks, results, outstanding, idle, stop):
+    while not stop.is_set():
+        with idle.get_lock():
+            idle.value += 1
+        try:
+            fixed = tasks.get(timeout=0.05)
+        except queue.Empty:
+            with outstanding.get_lock():
+                if outstanding.value == 0:  # nothing queued and nobody left to hand work over
+                    return
+            continue
+        finally:
+            with idle.get_lock():
+                idle.value -= 1
+
+        engine = csp.start_search(mrv, lcv, infer, fixed=fixed, **options)
+        while engine.run(steal_interval) == "running" and not stop.is_set():
+            if idle.value > 0:
+                donate(engine, fixed, tasks, outstanding)
+
+        if engine.status == "solved":
+            results.put((list(csp.assignment), csp.stats))
+            stop.set()
+        with outstanding.get_lock():
+            outstanding.value -= 1
+
+
+# hands the untried values of the shallowest decision with any left over to the task queue, each as a
+# subtree with the decisions above it fixed
+def donate(engine, fixed, tasks, outstanding):
+    path = dict(fixed)
+    for frame in engine.stack:
+        value = engine.csp.assignment[frame.var]
+        if frame.index < len(frame.values) and value is not None:
+            subtrees = []
+            for untried in frame.values[frame.index:]:
+                branch = dict(path)
+                branch[frame.var] = untried
+                subtrees.append(branch)
+            del frame.values[frame.index:]
+
+            with outstanding.get_lock():
+                outstanding.value += len(subtrees)
+            for branch in subtrees:
+                tasks.put(branch)
+            return
+        if value is None:
+            return
+        path[frame.var] = value
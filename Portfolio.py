@@ -0,0 +1,99 @@
+import multiprocessing
+import os
+import queue
+import time
+
+# search configurations tried by default, as keyword arguments to backtrack_search. they differ in how much
+# inference they do and in value order, since which one is fastest varies a lot between instances
+DEFAULT_CONFIGURATIONS = [
+    {"mrv": True, "lcv": False, "infer": True},
+    {"mrv": True, "lcv": True, "infer": True},
+    {"mrv": True, "lcv": False, "infer": False, "backjump": True, "nogood_limit": 1000},
+    {"mrv": True, "lcv": True, "infer": False},
+    {"mrv": True, "lcv": False, "infer": True, "seed": 1},
+    {"mrv": True, "lcv": False, "infer": True, "seed": 2},
+    {"mrv": True, "lcv": False, "infer": False, "backjump": True, "nogood_limit": 1000, "seed": 3},
+    {"mrv": False, "lcv": False, "infer": True, "seed": 4},
+    {"mrv": True, "lcv": False, "infer": True, "wdeg": True, "restarts": "luby", "seed": 5},
+]
+
+
+# runs backtrack search on given CSP with each configuration in its own process, at most workers at a time,
+# and stops every other process as soon as one finishes, since a complete search that fails also proves
+# there is no solution. leaves the winning assignment and stats on csp and returns the winning
+# configuration, or None if no configuration finished within timeout seconds of the start. raises
+# RuntimeError if every configuration's process exited without a result
+def portfolio_search(csp, configurations=None, workers=None, timeout=None):
+    if configurations is None:
+        configurations = DEFAULT_CONFIGURATIONS
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    context = process_context()
+    results = context.Queue()
+
+    deadline = None
+    if timeout is not None:
+        deadline = time.perf_counter() + timeout
+
+    pending = list(range(len(configurations)))
+    running = {}
+    crashed = {}    # index of every configuration whose process died without a result -> its exit code
+    winner = None
+    try:
+        while winner is None and (pending or running):
+            while pending and len(running) < workers:
+                index = pending.pop(0)
+                process = context.Process(target=run_configuration,
+                                          args=(csp, configurations[index], index, results))
+                process.daemon = True
+                process.start()
+                running[index] = process
+
+            try:
+                index, assignment, stats = results.get(timeout=0.05)
+            except queue.Empty:
+                # a process that exited normally has put its result, so only ones with an error are dropped
+                for index in list(running.keys()):
+                    if running[index].exitcode not in (None, 0):
+                        crashed[index] = running.pop(index).exitcode
+                if deadline is not None and time.perf_counter() >= deadline:
+                    break
+                continue
+            running.pop(index).join()
+            winner = index
+    finally:
+        for process in running.values():
+            process.terminate()
+        for process in running.values():
+            process.join()
+
+    for i in range(csp.assignment_length):
+        csp.assignment[i] = None
+    if winner is None and len(crashed) == len(configurations):
+        raise RuntimeError("every portfolio configuration exited with an error, exit codes {}".format(
+            sorted(set(crashed.values()))))
+    if winner is None:
+        return None
+
+    if assignment is not None:
+        for i in range(csp.assignment_length):
+            csp.assignment[i] = assignment[i]
+    csp.stats = stats
+    return configurations[winner]
+
+
+# returns multiprocessing context for worker processes, forking where possible, since forked processes get a
+# copy of the CSP without pickling it, so predicate constraints work too
+def process_context():
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context()
+
+
+# runs one configuration in a worker process and puts (index, assignment or None, stats) on results
+def run_configuration(csp, configuration, index, results):
+    assignment = csp.backtrack_search(**configuration)
+    if assignment is not None:
+        assignment = list(assignment)
+    results.put((index, assignment, csp.stats))
@@ -0,0 +1,242 @@
+# binary relation between the values of two variables, stored as one bitset row per value of the first
+# variable: bit b of rows[a] is set when the pair (a, b) is allowed
+class Relation:
+    def __init__(self, rows):
+        self.rows = rows    # list of ints
+
+    # builds a relation out of an iterable of allowed (int, int) pairs
+    @staticmethod
+    def from_pairs(pairs):
+        rows = []
+        for (a, b) in pairs:
+            while len(rows) <= a:
+                rows.append(0)
+            rows[a] |= 1 << b
+        return Relation(rows)
+
+    # returns true if pair (a, b) is allowed
+    def allows(self, a, b):
+        return a < len(self.rows) and (self.rows[a] >> b) & 1 == 1
+
+    # returns bitset of values in mask that are allowed with a
+    def supports(self, a, mask):
+        if a < len(self.rows):
+            return self.rows[a] & mask
+        return 0
+
+    # returns the same relation seen from the second variable
+    def transpose(self):
+        rows = []
+        for a in range(len(self.rows)):
+            row = self.rows[a]
+            bit = 1 << a
+            while row:
+                low = row & -row
+                b = low.bit_length() - 1
+                while len(rows) <= b:
+                    rows.append(0)
+                rows[b] |= bit
+                row ^= low
+        return Relation(rows)
+
+    # so relations can still be used like the old sets of pairs
+    def __contains__(self, pair):
+        return self.allows(pair[0], pair[1])
+
+    # returns the smallest value in mask allowed with a, or None if there is none
+    def first_support(self, a, mask):
+        supported = self.supports(a, mask)
+        if supported:
+            return (supported & -supported).bit_length() - 1
+        return None
+
+
+# relation stored like Relation, but with its rows left in a buffer such as a memory mapped file, row_bytes
+# little endian bytes each starting at offset. rows are only turned into ints when first needed, so loading
+# costs nothing and processes mapping the same file share one copy of the rows they never touch
+class MappedRelation:
+    def __init__(self, buffer, offset, row_bytes, count):
+        self.buffer = buffer        # memoryview of the bytes holding the rows
+        self.offset = offset        # position of the first row in buffer
+        self.row_bytes = row_bytes  # length of every row
+        self.count = count          # number of rows
+        self.read = {}              # dictionary mapping each value read so far to its row
+
+    # returns bitset of values allowed with a
+    def row(self, a):
+        row = self.read.get(a)
+        if row is None:
+            if a >= self.count:
+                return 0
+            start = self.offset + a * self.row_bytes
+            row = self.read[a] = int.from_bytes(self.buffer[start:start + self.row_bytes], "little")
+        return row
+
+    def allows(self, a, b):
+        return (self.row(a) >> b) & 1 == 1
+
+    def supports(self, a, mask):
+        return self.row(a) & mask
+
+    def first_support(self, a, mask):
+        supported = self.row(a) & mask
+        if supported:
+            return (supported & -supported).bit_length() - 1
+        return None
+
+    # reads every row, so better stored alongside than computed from a mapped relation
+    def transpose(self):
+        return Relation([self.row(a) for a in range(self.count)]).transpose()
+
+    def __contains__(self, pair):
+        return self.allows(pair[0], pair[1])
+
+
+# relation given by a function of two values, pairs are checked as needed and never stored
+class PredicateRelation:
+    def __init__(self, predicate, swapped=False):
+        self.predicate = predicate  # function taking (a, b), returns true if pair is allowed
+        self.swapped = swapped      # true if the arguments are passed to predicate in reverse order
+
+    def allows(self, a, b):
+        if self.swapped:
+            return self.predicate(b, a)
+        return self.predicate(a, b)
+
+    def supports(self, a, mask):
+        supported = 0
+        while mask:
+            low = mask & -mask
+            if self.allows(a, low.bit_length() - 1):
+                supported |= low
+            mask ^= low
+        return supported
+
+    def first_support(self, a, mask):
+        while mask:
+            low = mask & -mask
+            b = low.bit_length() - 1
+            if self.allows(a, b):
+                return b
+            mask ^= low
+        return None
+
+    def transpose(self):
+        return PredicateRelation(self.predicate, not self.swapped)
+
+    def __contains__(self, pair):
+        return self.allows(pair[0], pair[1])
+
+
+# two relations on the same pair of variables that must both hold
+class Conjunction:
+    def __init__(self, first, second):
+        self.first = first
+        self.second = second
+
+    def allows(self, a, b):
+        return self.first.allows(a, b) and self.second.allows(a, b)
+
+    def supports(self, a, mask):
+        return self.second.supports(a, self.first.supports(a, mask))
+
+    def first_support(self, a, mask):
+        supported = self.supports(a, mask)
+        if supported:
+            return (supported & -supported).bit_length() - 1
+        return None
+
+    def transpose(self):
+        return Conjunction(self.first.transpose(), self.second.transpose())
+
+    def __contains__(self, pair):
+        return self.allows(pair[0], pair[1])
+
+
+# built in relations, whose supports are computed with a few bit operations instead of calling a function
+# once per value. subclasses only need allows, forbidden and transpose
+class IntensionalRelation:
+    # returns bitset of values that are not allowed with a, possibly including values outside any domain
+    def forbidden(self, a):
+        raise NotImplementedError
+
+    def supports(self, a, mask):
+        return mask & ~self.forbidden(a)
+
+    def first_support(self, a, mask):
+        supported = self.supports(a, mask)
+        if supported:
+            return (supported & -supported).bit_length() - 1
+        return None
+
+    def __contains__(self, pair):
+        return self.allows(pair[0], pair[1])
+
+
+# the two values must differ
+class NotEqual(IntensionalRelation):
+    def allows(self, a, b):
+        return a != b
+
+    def forbidden(self, a):
+        return 1 << a
+
+    def transpose(self):
+        return self
+
+
+# the first value must be smaller than the second
+class LessThan(IntensionalRelation):
+    def allows(self, a, b):
+        return a < b
+
+    def forbidden(self, a):
+        return (1 << (a + 1)) - 1
+
+    def transpose(self):
+        return GreaterThan()
+
+
+# the first value must be larger than the second
+class GreaterThan(IntensionalRelation):
+    def allows(self, a, b):
+        return a > b
+
+    def forbidden(self, a):
+        return ~((1 << a) - 1)
+
+    def transpose(self):
+        return LessThan()
+
+
+# values are bottom left corners of two rectangles on a grid of given length, with y * length + x encoding,
+# and the rectangles may not overlap
+class NoOverlap(IntensionalRelation):
+    def __init__(self, length1, height1, length2, height2, grid_length):
+        self.length1 = length1          # size of first rectangle
+        self.height1 = height1
+        self.length2 = length2          # size of second rectangle
+        self.height2 = height2
+        self.grid_length = grid_length  # length of grid, for decoding values
+
+    def allows(self, a, b):
+        x1, y1 = a % self.grid_length, a // self.grid_length
+        x2, y2 = b % self.grid_length, b // self.grid_length
+        return x1 + self.length1 <= x2 or x2 + self.length2 <= x1 or \
+            y1 + self.height1 <= y2 or y2 + self.height2 <= y1
+
+    # corners of the second rectangle that overlap the first are a block of x and y values, one run of bits
+    # per row
+    def forbidden(self, a):
+        x, y = a % self.grid_length, a // self.grid_length
+        x_low = max(0, x - self.length2 + 1)
+        x_high = min(self.grid_length - 1, x + self.length1 - 1)
+        run = ((1 << (x_high - x_low + 1)) - 1) << x_low
+
+        forbidden = 0
+        for row in range(max(0, y - self.height2 + 1), y + self.height1):
+            forbidden |= run << (row * self.grid_length)
+        return forbidden
+
+    def transpose(self):
+        return NoOverlap(self.length2, self.height2, self.length1, self.height1, self.grid_length)
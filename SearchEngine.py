@@ -0,0 +1,314 @@
+from time import perf_counter
+
+
+# one decision on the search stack: the variable, the values left to try for it, and what is needed to undo
+# the value currently being tried
+class SearchFrame:
+    __slots__ = ("var", "values", "index", "conflict", "mark", "pruned")
+
+    def __init__(self, var, values, conflict):
+        self.var = var              # variable decided at this depth
+        self.values = values        # ordered list of values to try
+        self.index = 0              # index of next value to try
+        self.conflict = conflict    # variables responsible for values failing so far, when backjumping
+        self.mark = None            # domain store marker from before the current value was assigned
+        self.pruned = None          # variables whose domains were forward checked by the current value
+
+
+# factor the fail cutoff grows by after every geometric restart
+GEOMETRIC_GROWTH = 1.5
+
+
+# backtrack search with an explicit stack instead of recursion, so depth is not limited by python's recursion
+# limit. the search advances one value trial per step, so it can be paused after any number of steps,
+# inspected through its stack, and resumed by running it again. with a restart policy the search goes back
+# to the root once enough values have failed, keeping constraint weights and nogoods learned so far
+class SearchEngine:
+    def __init__(self, csp, mrv, lcv, infer, wdeg=False, restarts=None, restart_base=100):
+        self.csp = csp          # ConstraintSatisfactionProblem being searched, whose state is used directly
+        self.mrv = mrv          # booleans indicating whether to use each heuristic and mac-3 inference
+        self.lcv = lcv
+        self.infer = infer
+        self.wdeg = wdeg        # boolean indicating whether to choose variables by dom/wdeg instead of mrv
+
+        self.restarts = restarts            # restart policy: None, "luby" or "geometric"
+        self.restart_base = restart_base    # fails allowed before the first restart
+        self.cutoff = self.restart_cutoff(0)
+        self.restart_fails = 0              # fails when the search last started over
+
+        # number of decisions currently using each value, when breaking value symmetry
+        self.uses = None
+        if csp.break_symmetry:
+            self.uses = [0] * csp.domain_length
+
+        self.stack = []         # list of SearchFrame objects, one per decision
+        self.steps = 0          # number of value trials so far
+        self.status = "running"
+
+        # make every arc consistent before the first decision
+        if infer and not csp.arc_consistency(csp.constraints.all_arcs(), range(csp.assignment_length)):
+            self.status = "failed"
+        else:
+            self.open_frame()
+
+    # runs until a solution is found, the search space is exhausted, or max_steps more value trials have been
+    # made, returns status: "solved", "failed" or "running" if paused
+    def run(self, max_steps=None):
+        taken = 0
+        while self.status == "running" and (max_steps is None or taken < max_steps):
+            self.step()
+            taken += 1
+        return self.status
+
+    # after a solution, undoes the deepest decision so that running again finds the next solution. only sound
+    # without backjumping, symmetry breaking and restarts, which would skip or repeat solutions
+    def resume(self):
+        if self.status != "solved":
+            return
+        if not self.stack:  # nothing was decided, so there is only one solution
+            self.status = "failed"
+            return
+        self.status = "running"
+        self.undo_value(self.stack[-1])
+
+    # returns list of (variable, value) decisions currently on the stack
+    def path(self):
+        return [(frame.var, self.csp.assignment[frame.var]) for frame in self.stack
+                if self.csp.assignment[frame.var] is not None]
+
+    # chooses the next variable and pushes a frame for it, or marks the search solved if none are left
+    def open_frame(self):
+        csp = self.csp
+        stats = csp.stats
+
+        # assignment is complete, and valid since every value was checked when it was assigned
+        if len(csp.decisions) == csp.assignment_length:
+            self.status = "solved"
+            if csp.listeners:
+                csp.notify("solution", None, None)
+            return
+
+        # dom/wdeg or minimum remaining values heuristic
+        if self.wdeg:
+            start = perf_counter()
+            var = csp.wdeg_heuristic()
+            stats.mrv_time += perf_counter() - start
+        elif self.mrv:
+            start = perf_counter()
+            var = csp.mrv_heuristic()
+            stats.mrv_time += perf_counter() - start
+        else:
+            var = csp.no_variable_heuristic()
+
+        # least constraining value heuristic
+        if self.lcv:
+            start = perf_counter()
+            values = csp.lcv_heuristic(var)
+            stats.lcv_time += perf_counter() - start
+        else:
+            values = csp.domains.values(var)
+            if csp.random is not None:
+                csp.random.shuffle(values)
+        # value of the last solution first, when solving again after a change
+        if csp.preferred is not None and csp.preferred[var] in values:
+            values.remove(csp.preferred[var])
+            values.insert(0, csp.preferred[var])
+        if self.uses is not None:
+            values = self.drop_symmetric(values)
+
+        # variables responsible for every value of var failing, starting with the ones that pruned its domain
+        conflict = None
+        if csp.backjump:
+            conflict = csp.removal_explanation(var, self.infer)
+        if var in csp.smaller or var in csp.larger:
+            values = self.keep_increasing(var, values, conflict)
+
+        self.stack.append(SearchFrame(var, values, conflict))
+
+    # tries the next value of the deepest variable, going deeper if it works and back up if none are left
+    def step(self):
+        csp = self.csp
+        if self.cutoff is not None and csp.stats.fails - self.restart_fails >= self.cutoff:
+            self.restart()
+            return
+
+        frame = self.stack[-1]
+        if frame.index == len(frame.values):
+            self.retreat()
+            return
+
+        self.steps += 1
+        var = frame.var
+        val = frame.values[frame.index]
+        frame.index += 1
+
+        csp.assignment[var] = val
+        # only var changed, so only its constraints need to be checked
+        consistent = csp.constraints.is_consistent(csp.assignment, var)
+
+        if consistent and csp.backjump:
+            # remembered failing partial assignment
+            nogood = csp.nogoods.violated(csp.assignment, var, val)
+            if nogood is not None:
+                consistent = False
+                frame.conflict.update(nogood)
+        elif csp.backjump:
+            frame.conflict.update(csp.constraints.conflict_set(csp.assignment, var))
+
+        if not consistent:  # increment fails
+            csp.stats.fails += 1
+            if csp.listeners:
+                csp.notify("fail", var, val)
+            csp.assignment[var] = None
+            return
+
+        csp.stats.nodes += 1
+        if csp.listeners:
+            csp.notify("assign", var, val)
+
+        frame.mark = csp.domains.mark()
+        frame.pruned = []
+        csp.domains.assign(var, val)
+        csp.decisions.append(var)
+        if self.uses is not None:
+            self.uses[val] += 1
+        if self.wdeg:
+            csp.weight_heap.assign(var)
+
+        # prune neighbors' domains: full mac-3 with inference, otherwise just forward checking so the
+        # heuristics see up to date domain sizes
+        if self.infer or self.mrv or self.lcv or self.wdeg:
+            start = perf_counter()
+            if self.infer:
+                consistent = csp.mac_infer(var)
+            else:
+                consistent = csp.forward_check(var, frame.pruned)
+            csp.stats.inference_time += perf_counter() - start
+
+        if consistent:
+            self.open_frame()
+        else:   # inference emptied some domain
+            csp.stats.fails += 1
+            if csp.listeners:
+                csp.notify("fail", var, val)
+            if csp.backjump:
+                conflict = csp.wipeout_explanation(var, self.infer)
+                self.undo_value(frame)
+                self.absorb(conflict)
+            else:
+                self.undo_value(frame)
+
+    # pops the deepest frame, whose values are exhausted, and moves back to the variable responsible
+    def retreat(self):
+        csp = self.csp
+        frame = self.stack.pop()
+        conflict = frame.conflict
+        csp.stats.backtracks += 1
+        if csp.listeners:
+            csp.notify("backtrack", frame.var, None)
+        if csp.backjump:
+            csp.nogoods.add(csp.assignment, conflict)
+
+        if not self.stack:  # no solution
+            self.status = "failed"
+            return
+
+        parent = self.stack[-1]
+        self.undo_value(parent)
+        if csp.backjump:
+            self.absorb(conflict)
+
+    # handles a failure below the deepest frame, explained by given conflict set, once its value is undone
+    def absorb(self, conflict):
+        frame = self.stack[-1]
+        if frame.var not in conflict:
+            # var had nothing to do with the failure, so no other value of it can help: jump back
+            frame.index = len(frame.values)
+            frame.conflict = conflict
+        else:
+            frame.conflict.update(conflict)
+            frame.conflict.discard(frame.var)
+
+    # undoes the value currently assigned at given frame
+    def undo_value(self, frame):
+        csp = self.csp
+        csp.domains.undo(frame.mark)
+        csp.decisions.pop()
+        for neighbor in frame.pruned:
+            csp.pruned_by[neighbor].pop()
+        if self.uses is not None:
+            self.uses[csp.assignment[frame.var]] -= 1
+        csp.assignment[frame.var] = None
+        if self.mrv:
+            csp.variable_heap.update(frame.var)   # var can be chosen again
+        if self.wdeg:
+            csp.weight_heap.unassign(frame.var)
+
+    # returns given values without all but the first of those no decision uses and no variable was restricted
+    # to. those values are interchangeable, so if the first one fails the rest would fail the same way
+    def drop_symmetric(self, values):
+        kept = []
+        unused_kept = False
+        for value in values:
+            if self.uses[value] or (self.csp.used_values >> value) & 1:
+                kept.append(value)
+            elif not unused_kept:
+                kept.append(value)
+                unused_kept = True
+        return kept
+
+    # returns given values of var that are larger than the value of the variable before it in its group of
+    # symmetric variables and smaller than the one after it, when those are assigned. neighbors in the group
+    # that ruled some value out are added to conflict, if backjumping
+    def keep_increasing(self, var, values, conflict):
+        assignment = self.csp.assignment
+        kept = values
+        for (neighbor, before) in ((self.csp.smaller.get(var), True), (self.csp.larger.get(var), False)):
+            if neighbor is None or assignment[neighbor] is None:
+                continue
+            bound = assignment[neighbor]
+            if before:
+                allowed = [value for value in kept if value > bound]
+            else:
+                allowed = [value for value in kept if value < bound]
+            if len(allowed) < len(kept) and conflict is not None:
+                conflict.add(neighbor)
+            kept = allowed
+        return kept
+
+    # undoes every decision and starts over from the root with the next cutoff
+    def restart(self):
+        csp = self.csp
+        while self.stack:
+            frame = self.stack.pop()
+            if csp.assignment[frame.var] is not None:
+                self.undo_value(frame)
+
+        csp.stats.restarts += 1
+        if csp.listeners:
+            csp.notify("restart", None, None)
+        self.restart_fails = csp.stats.fails
+        self.cutoff = self.restart_cutoff(csp.stats.restarts)
+        self.open_frame()
+
+    # returns number of fails allowed after given number of restarts, None if the search never restarts
+    def restart_cutoff(self, restarts):
+        if self.restarts == "luby":
+            return self.restart_base * luby(restarts + 1)
+        if self.restarts == "geometric":
+            return int(self.restart_base * GEOMETRIC_GROWTH ** restarts)
+        return None
+
+
+# returns ith term of the luby sequence 1, 1, 2, 1, 1, 2, 4, 1, 1, 2, ..., starting from i = 1
+def luby(i):
+    k = 1
+    while (1 << k) - 1 < i:
+        k += 1
+    while (1 << k) - 1 != i:
+        # i is in the second copy of the sequence before the next power of two
+        i -= (1 << (k - 1)) - 1
+        k = 1
+        while (1 << k) - 1 < i:
+            k += 1
+    return 1 << (k - 1)
@@ -0,0 +1,30 @@
+# counters for one search, filled in as it runs and left on the CSP afterwards
+class SearchStats:
+    def __init__(self):
+        self.nodes = 0              # values assigned that passed the consistency check
+        self.fails = 0              # values that failed the consistency check or inference
+        self.backtracks = 0         # variables whose values ran out
+        self.restarts = 0           # times the search started over
+        self.revisions = 0          # revisions of arcs and global constraints by inference and forward checking
+        self.prunings = 0           # values removed from domains by those revisions
+        self.mrv_time = 0.0         # seconds spent choosing variables
+        self.lcv_time = 0.0         # seconds spent ordering values
+        self.inference_time = 0.0   # seconds spent in inference and forward checking
+
+    # adds every counter of other stats to these
+    def add(self, other):
+        self.nodes += other.nodes
+        self.fails += other.fails
+        self.backtracks += other.backtracks
+        self.restarts += other.restarts
+        self.revisions += other.revisions
+        self.prunings += other.prunings
+        self.mrv_time += other.mrv_time
+        self.lcv_time += other.lcv_time
+        self.inference_time += other.inference_time
+
+    def __str__(self):
+        return "{:d} nodes, {:d} fails, {:d} backtracks, {:d} restarts, {:d} revisions, {:d} prunings, " \
+               "{:.4f}s mrv, {:.4f}s lcv, {:.4f}s inference".format(
+                   self.nodes, self.fails, self.backtracks, self.restarts, self.revisions, self.prunings,
+                   self.mrv_time, self.lcv_time, self.inference_time)
@@ -0,0 +1,100 @@
+import hashlib
+import json
+import sqlite3
+from collections import OrderedDict
+
+
+# bounded cache of solutions by problem fingerprint, kept in memory with the least recently used evicted when
+# full, and when given a path also in an sqlite database there, so solutions outlive the process. problems
+# without a solution are cached too, as None
+class SolutionCache:
+    def __init__(self, path=None, limit=10000):
+        self.limit = limit                  # maximum number of solutions kept in memory
+        self.solutions = OrderedDict()      # fingerprint -> list of values or None, least recently used first
+        self.hits = 0
+        self.misses = 0
+
+        self.connection = None
+        if path is not None:
+            self.connection = sqlite3.connect(path)
+            self.connection.execute("CREATE TABLE IF NOT EXISTS solutions "
+                                    "(fingerprint TEXT PRIMARY KEY, solution TEXT)")
+            self.connection.commit()
+
+    # returns (true, solution) if a solution, or None for no solution, is cached for given fingerprint,
+    # otherwise (false, None)
+    def get(self, fingerprint):
+        if fingerprint in self.solutions:
+            self.solutions.move_to_end(fingerprint)
+            self.hits += 1
+            return True, self.solutions[fingerprint]
+
+        if self.connection is not None:
+            row = self.connection.execute("SELECT solution FROM solutions WHERE fingerprint = ?",
+                                          (fingerprint,)).fetchone()
+            if row is not None:
+                solution = json.loads(row[0])
+                self.remember(fingerprint, solution)
+                self.hits += 1
+                return True, solution
+
+        self.misses += 1
+        return False, None
+
+    # caches given solution, a list of values or None if there is none, for given fingerprint
+    def put(self, fingerprint, solution):
+        if solution is not None:
+            solution = list(solution)
+        self.remember(fingerprint, solution)
+        if self.connection is not None:
+            self.connection.execute("INSERT OR REPLACE INTO solutions VALUES (?, ?)",
+                                    (fingerprint, json.dumps(solution)))
+            self.connection.commit()
+
+    # keeps solution in memory, evicting the least recently used one if full
+    def remember(self, fingerprint, solution):
+        self.solutions[fingerprint] = solution
+        self.solutions.move_to_end(fingerprint)
+        if len(self.solutions) > self.limit:
+            self.solutions.popitem(last=False)
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+# returns hex digest identifying given CSP by what it allows rather than how it was built: the number of
+# variables and values, restricted domains, every binary constraint as the bitset of allowed values of its
+# second variable per value of the first, and every global constraint by type and scope. two CSPs built from
+# different names, colors, edge orders or relation types get the same fingerprint when they have the same
+# variables and constraints. fixed is a dictionary of variables further restricted to a single value, as
+# backtrack_search takes it, and gives the fingerprint of the CSP with those domains
+def fingerprint(csp, fixed=None):
+    digest = hashlib.sha256()
+    digest.update("{:d} {:d}".format(csp.assignment_length, csp.domain_length).encode())
+    full = (1 << csp.domain_length) - 1
+
+    domains = csp.restricted_domains()
+    if fixed:
+        domains = dict(domains)
+        for var in fixed.keys():
+            allowed = domains.get(var, range(csp.domain_length))
+            domains[var] = [fixed[var]] if fixed[var] in allowed else []
+
+    for var in sorted(domains.keys()):
+        values = sorted(set(domains[var]))
+        digest.update(" d{:d}:{}".format(var, values).encode())
+
+    for (i, j) in sorted(csp.constraints.constraints.keys()):
+        if i < j:   # the reverse arc is its transpose
+            relation = csp.constraints.constraints[(i, j)]
+            rows = [relation.supports(a, full) for a in range(csp.domain_length)]
+            digest.update(" c{:d},{:d}:{}".format(i, j, ",".join("{:x}".format(row) for row in rows)).encode())
+
+    scopes = sorted((type(constraint).__name__, sorted(constraint.variables))
+                    for constraint in csp.constraints.global_constraints)
+    for name, variables in scopes:
+        digest.update(" g{}:{}".format(name, variables).encode())
+
+    return digest.hexdigest()
@@ -0,0 +1,159 @@
+from Decomposition import connected_components, forward_check
+from SearchStats import SearchStats
+
+
+# returns number of solutions of given CSP, without listing them. the count of independent components is
+# the product of their counts, and trees are counted in one pass from the leaves up. other components are
+# counted by branching on the variable with fewest values left, forward checking, and counting what is left
+# as components again. once forward checking has run, what is left only depends on the variables left and
+# their domains, so the counts of up to cache_limit such subproblems are kept and reused whenever the same
+# one comes up again under a different partial assignment
+def count_solutions(csp, cache_limit=100000):
+    csp.stats = SearchStats()
+    for i in range(csp.assignment_length):
+        csp.assignment[i] = None
+    csp.reset_domains()
+
+    cache = {}
+    total = 1
+    for component in connected_components(csp.constraints, range(csp.assignment_length)):
+        total *= count_component(csp, component, cache, cache_limit)
+        if total == 0:
+            break
+    return total
+
+
+# one branching variable on the counting stack: the component it was chosen in, its values and how far they
+# have been counted, and the parts left counting for the value currently assigned
+class CountFrame:
+    __slots__ = ("key", "var", "rest", "values", "index", "total", "mark", "parts", "part", "product")
+
+    def __init__(self, key, var, rest, values):
+        self.key = key          # cache key of the component
+        self.var = var          # variable branched on
+        self.rest = rest        # other variables of the component
+        self.values = values    # values of var to count
+        self.index = 0          # index of next value to count
+        self.total = 0          # solutions counted so far
+        self.mark = None        # domain store marker from before the current value was assigned
+        self.parts = None       # components left once the current value is forward checked, None if none
+        self.part = 0           # index of next part to count
+        self.product = 1        # product of the counts of the parts counted so far
+
+
+# returns number of solutions of given connected component of unassigned variables, under their current
+# domains. branching is done with an explicit stack of CountFrame objects rather than recursion, so the
+# number of variables branched on in a row is not limited by python's recursion limit
+def count_component(csp, component, cache, cache_limit):
+    stack = []
+    result = open_component(csp, component, cache, stack)
+    while stack:
+        frame = stack[-1]
+        if result is not None:  # the part last opened was counted
+            frame.product *= result
+            result = None
+        if frame.parts is not None and frame.part < len(frame.parts) and frame.product != 0:
+            frame.part += 1
+            result = open_component(csp, frame.parts[frame.part - 1], cache, stack)
+            continue
+        if frame.parts is not None:     # every part of the current value counted
+            frame.total += frame.product
+            frame.parts = None
+            csp.domains.undo(frame.mark)
+
+        if frame.index < len(frame.values):
+            value = frame.values[frame.index]
+            frame.index += 1
+            csp.assignment[frame.var] = value
+            if not csp.constraints.is_consistent(csp.assignment, frame.var):
+                csp.stats.fails += 1
+                continue
+
+            csp.stats.nodes += 1
+            frame.mark = csp.domains.mark()
+            csp.domains.assign(frame.var, value)
+            if forward_check(csp, frame.var):
+                frame.parts = connected_components(csp.constraints, frame.rest)
+                frame.part = 0
+                frame.product = 1
+            else:
+                csp.stats.fails += 1
+                csp.domains.undo(frame.mark)
+            continue
+
+        csp.assignment[frame.var] = None
+        stack.pop()
+        if len(cache) < cache_limit:
+            cache[frame.key] = frame.total
+        result = frame.total
+    return result
+
+
+# returns number of solutions of given component if it is a tree or was counted before, otherwise pushes a
+# frame branching on its variable with fewest values left and returns None. the cache key is the set of
+# variables in the component paired with their domains, which takes one pass over it like finding the
+# component did, and no sorting
+def open_component(csp, component, cache, stack):
+    if is_tree(csp.constraints, component):
+        return count_tree(csp, component)
+
+    domains = csp.domains.domains
+    key = frozenset([(var, domains[var]) for var in component])
+    if key in cache:
+        return cache[key]
+
+    var = component[0]
+    for other in component:
+        if csp.domains.size(other) < csp.domains.size(var):
+            var = other
+    rest = [other for other in component if other != var]
+    stack.append(CountFrame(key, var, rest, csp.domains.values(var)))
+    return None
+
+
+# returns true if given connected component has only binary constraints and one fewer of them than variables
+def is_tree(constraints, component):
+    members = set(component)
+    edges = 0
+    for var in component:
+        if var in constraints.globals_of:
+            return False
+        edges += len(members.intersection(constraints.neighbors.get(var, ())))
+    return edges == 2 * (len(component) - 1)
+
+
+# returns number of solutions of given tree of variables: for every variable and value, the number of ways
+# to complete the subtree below it is the product, over its children, of those numbers summed over the
+# child's values allowed with it. done from the leaves up, so in time linear in the size of the tree
+def count_tree(csp, tree):
+    members = set(tree)
+    parent = {tree[0]: None}
+    order = [tree[0]]   # breadth first, so every parent comes before its children
+    for var in order:
+        for neighbor in csp.constraints.neighbors.get(var, ()):
+            if neighbor in members and neighbor not in parent:
+                parent[neighbor] = var
+                order.append(neighbor)
+
+    ways = {}   # dictionary mapping each variable to dictionary from value to number of ways below it
+    for var in reversed(order):
+        counts = {}
+        for value in csp.domains.values(var):
+            counts[value] = 1
+        for child in csp.constraints.neighbors.get(var, ()):
+            if parent.get(child) != var or child not in members:
+                continue
+            relation = csp.constraints.get_constraints(var, child)
+            for value in counts.keys():
+                below = 0
+                supported = relation.supports(value, csp.domains.domains[child])
+                while supported:
+                    low = supported & -supported
+                    below += ways[child][low.bit_length() - 1]
+                    supported ^= low
+                counts[value] *= below
+            del ways[child]
+        ways[var] = counts
+        csp.stats.nodes += 1
+
+    return sum(ways[tree[0]].values())
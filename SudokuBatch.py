@@ -0,0 +1,117 @@
+import collections
+import os
+import time
+
+from Portfolio import process_context
+from SudokuCSP import SYMBOLS
+from SudokuSolver import get_solver
+
+
+# solves a stream of puzzles, one per line as box_size^4 characters read from the top left corner going right
+# then down, with "." or "0" for an empty square and SYMBOLS for values. lines are sent to worker processes
+# in chunks of chunk_size, with at most max_in_flight chunks handed out and not yet collected, so memory use
+# stays bounded however long the input is. blank lines and lines starting with "#" are skipped. yields
+# (puzzle, solution, guesses, seconds) for every puzzle in input order, where solution is a line in the same
+# format, "invalid" if the line could not be read or None if the puzzle has no solution
+def batch_solve(lines, box_size=3, workers=None, chunk_size=256, max_in_flight=None):
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if max_in_flight is None:
+        max_in_flight = 2 * workers
+
+    # a single worker solves in this process, without the cost of sending puzzles anywhere
+    if workers == 1:
+        for chunk in read_chunks(lines, chunk_size):
+            for result in solve_chunk(chunk, box_size):
+                yield result
+        return
+
+    context = process_context()
+
+    pool = context.Pool(workers)
+    try:
+        pending = collections.deque()   # results of chunks handed out, in input order
+        for chunk in read_chunks(lines, chunk_size):
+            if len(pending) >= max_in_flight:
+                for result in pending.popleft().get():
+                    yield result
+            pending.append(pool.apply_async(solve_chunk, (chunk, box_size)))
+
+        while pending:
+            for result in pending.popleft().get():
+                yield result
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+# solves every puzzle in the file at input_path with batch_solve, and writes one line per puzzle to the file at
+# output_path: the puzzle, its solution, the number of guesses and the microseconds taken, separated by tabs.
+# returns dictionary counting "solved", "unsolvable" and "invalid" puzzles
+def batch_solve_file(input_path, output_path, box_size=3, workers=None, chunk_size=256, max_in_flight=None):
+    counts = {"solved": 0, "unsolvable": 0, "invalid": 0}
+    with open(input_path) as puzzles, open(output_path, "w") as output:
+        for puzzle, solution, guesses, seconds in batch_solve(puzzles, box_size, workers, chunk_size,
+                                                              max_in_flight):
+            if solution is None:
+                counts["unsolvable"] += 1
+                solution = "none"
+            elif solution == "invalid":
+                counts["invalid"] += 1
+            else:
+                counts["solved"] += 1
+            output.write(puzzle + "\t" + solution + "\t" + str(guesses) + "\t" + str(int(seconds * 1000000)) +
+                         "\n")
+    return counts
+
+
+# generator of lists of up to chunk_size puzzle lines, stripped, leaving out blank lines and comments
+def read_chunks(lines, chunk_size):
+    chunk = []
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        chunk.append(line)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# solves list of puzzle lines with the shared bitmask solver of this process, returns list of results as
+# yielded by batch_solve
+def solve_chunk(chunk, box_size):
+    solver = get_solver(box_size)
+    results = []
+    for puzzle in chunk:
+        start = time.perf_counter()
+        values = line_to_values(puzzle, solver.size)
+        if values is None:
+            results.append((puzzle, "invalid", 0, 0.0))
+            continue
+
+        solution = solver.solve(values)
+        if solution is not None:
+            solution = "".join(SYMBOLS[value - 1] for value in solution)
+        results.append((puzzle, solution, solver.guesses, time.perf_counter() - start))
+    return results
+
+
+# given puzzle line, returns list of square values, 0 for empty, or None if the line is not a puzzle of
+# given size
+def line_to_values(line, size):
+    if len(line) != size * size:
+        return None
+
+    values = []
+    for char in line:
+        if char == "." or char == "0":
+            values.append(0)
+        else:
+            value = SYMBOLS.find(char.upper()) + 1
+            if value == 0 or value > size:
+                return None
+            values.append(value)
+    return values
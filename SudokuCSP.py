@@ -1,303 +1,201 @@
 # Paolo Takagi-Atilano, October 17, 2017
 
+import os
+
 from ConstraintSatisfactionProblem import ConstraintSatisfactionProblem
+from CompiledCSP import save_csp, load_csp
+from AllDifferent import AllDifferent
+from SudokuSolver import get_solver
+from DancingLinks import DancingLinks
+
+# characters used to write values, so boards up to 25x25 have one character per square
+SYMBOLS = "123456789ABCDEFGHIJKLMNOP"
 
 
 class SudokuCSP:
-    def __init__(self, given_numbers):
+    # compiled is the path of a file holding the CSP as written by CompiledCSP.save_csp. it is loaded with the
+    # domains of these givens instead of building the constraints when it was written for the same box size,
+    # and written after building them otherwise
+    def __init__(self, given_numbers, box_size=3, compiled=None):
 
         self.given_numbers = given_numbers              # format: (value, x, y); 0,0 is the bottom left corner
-        self.domain = [1, 2, 3, 4, 5, 6, 7, 8, 9]
+        self.box_size = box_size                        # size of each box, 3 for a regular 9x9 sudoku
+        self.size = box_size * box_size                 # length of every row, column and box
+        self.domain = list(range(1, self.size + 1))
 
         self.given_dict = {}     # key is position, value is value
         # givens
         for given in self.given_numbers:
             self.given_dict[self.coord_to_int(given[1], given[2])] = given[0]
 
-        self.constraints = self.set_constraints()
-        self.CSP = ConstraintSatisfactionProblem(81, 10, self.constraints)      # hardcoded because sudoku
+        self.domains = self.set_domains()
+        self.CSP = None
+        source = "SudokuCSP {:d}".format(box_size)
+        if compiled is not None and os.path.exists(compiled):
+            self.CSP = load_csp(compiled, self.domains, source, self.size * self.size, self.size)
+        if self.CSP is None:
+            self.constraints = self.set_constraints()
+            self.CSP = ConstraintSatisfactionProblem(self.size * self.size, self.size, {}, self.domains,
+                                                     self.constraints)
+            if compiled is not None:
+                save_csp(self.CSP, compiled, source)
+        else:
+            self.constraints = self.CSP.constraints.global_constraints
 
+    # every row, column and box has all different values
     def set_constraints(self):
-        # first find the domain of every single value
-        single_var_constraint = {}
-        for x in range(10):
-            for y in range(10):
-                if self.coord_to_int(x, y) not in self.given_dict.keys():
-                    local_can = self.local_can_values(x, y)
-                    vertical_can = self.vertical_can_values(y)
-                    horizontal_can = self.horizontal_can_values(x)
-
-                    valid_vals = set()
-                    for i in range(10):  # domain values that given x,y can be
-                        if i in local_can and vertical_can and horizontal_can:
-                            valid_vals.add(i)
-                    single_var_constraint[self.coord_to_int(x, y)] = valid_vals
-
-        # now create constraints
-        constraints = {}
-        for x_1 in range(10):
-            for y_1 in range(10):
-                for x_2 in range(10):
-                    for y_2 in range(10):
-                        if x_1 != x_2 and y_1 != y_2:   # check to make sure not the same square
-                            common_location_list1 = set()
-                            common_location_list2 = set()
-                            if self.coord_to_int(x_1, y_1) in single_var_constraint.keys():
-                                if self.coord_to_int(x_2, y_2) in single_var_constraint.keys():
-                                    for val1 in single_var_constraint[self.coord_to_int(x_1, y_1)]:
-                                        for val2 in single_var_constraint[self.coord_to_int(x_2, y_2)]:
-                                            if self.no_influence(x_1, y_1, x_2, y_2):
-                                                common_location_list1.add((val1, val2))
-                                                common_location_list2.add((val2, val1))
-                                            else:   # add all values except same values
-                                                if val1 != val2:
-                                                    common_location_list1.add((val1, val2))
-                                                    common_location_list2.add((val2, val1))
-                            if len(common_location_list1) > 0:
-                                constraints[self.coord_to_int(x_1, y_1),
-                                            self.coord_to_int(x_2, y_2)] = common_location_list1
-                            if len(common_location_list2) > 0:
-                                constraints[self.coord_to_int(x_2, y_2),
-                                            self.coord_to_int(x_1, y_1)] = common_location_list2
-
-        #print("constraints:",constraints)
+        constraints = []
+        for i in range(self.size):
+            constraints.append(AllDifferent([self.coord_to_int(x, i) for x in range(self.size)]))   # row
+            constraints.append(AllDifferent([self.coord_to_int(i, y) for y in range(self.size)]))   # column
+
+        for x_corner in range(0, self.size, self.box_size):
+            for y_corner in range(0, self.size, self.box_size):
+                box = []
+                for x in range(x_corner, x_corner + self.box_size):
+                    for y in range(y_corner, y_corner + self.box_size):
+                        box.append(self.coord_to_int(x, y))
+                constraints.append(AllDifferent(box))
+
         return constraints
 
-    def no_influence(self, x_1, y_1, x_2, y_2):
-        # see if on same row
-        test1 = False
-        test2 = False
-        for x_loc in range(10):
-            if x_loc == x_1:
-                test1 = True
-            if x_loc == x_2:
-                test2 = True
-        if test1 and test2:
-            return False
-
-        # see if on same column
-        test1 = False
-        test2 = False
-        for y_loc in range(10):
-            if y_loc == y_1:
-                test1 = True
-            if y_loc == y_2:
-                test2 = True
-        if test1 and test2:
-            return False
-
-        # test to see if in same 9-group:
-        if 0 <= x_1 <= 2 and 0 <= y_1 <= 2 and 0 <= x_2 <= 2 and 0 <= y_2 <= 2:  # bottom left
-            return False
-        if 3 <= x_1 <= 5 and 0 <= y_1 <= 2 and 3 <= x_2 <= 5 and 0 <= y_2 <= 2:  # bottom middle
-            return False
-        if 6 <= x_1 <= 8 and 0 <= y_1 <= 2 and 6 <= x_2 <= 8 and 0 <= y_2 <= 2:  # bottom right
-            return False
-        if 0 <= x_1 <= 2 and 3 <= y_1 <= 5 and 0 <= x_2 <= 2 and 3 <= y_2 <= 5:  # middle left
-            return False
-        if 3 <= x_1 <= 5 and 3 <= y_1 <= 5 and 3 <= x_2 <= 5 and 3 <= y_2 <= 5:  # middle middle
-            return False
-        if 6 <= x_1 <= 8 and 3 <= y_1 <= 5 and 6 <= x_2 <= 8 and 3 <= y_2 <= 5:  # middle right
-            return False
-        if 0 <= x_1 <= 2 and 6 <= y_1 <= 8 and 0 <= x_2 <= 2 and 6 <= y_2 <= 8:  # top left
-            return False
-        if 3 <= x_1 <= 5 and 6 <= y_1 <= 8 and 3 <= x_2 <= 5 and 6 <= y_2 <= 8:  # top middle
-            return False
-        if 6 <= x_1 <= 8 and 6 <= y_1 <= 8 and 6 <= x_2 <= 8 and 6 <= y_2 <= 8:  # top right
-            return False
-
-        return True
-
-
-    def vertical_can_values(self, y):
-        good = set()
-        bad = set()
-        for x_loc in range(10):
-            loc = self.coord_to_int(x_loc, y)
-            if loc in self.given_dict.keys():
-                bad.add(self.given_dict[loc])
-
-        for i in range(len(self.domain)):
-            if i not in bad:
-                good.add(self.domain[i])
-        return good
-
-    def horizontal_can_values(self, x):
-        good = set()
-        bad = set()
-        for y_loc in range(10):
-            loc = self.coord_to_int(x, y_loc)
-            if loc in self.given_dict.keys():
-                bad.add(self.given_dict[loc])
-
-        for i in range(len(self.domain)):
-            if i not in bad:
-                good.add(self.domain[i])
-        return good
-
-    # returns set of values that it cannot be, given x and y, based on given values:
-    def local_can_values(self, x, y,):
-
-        # find location within square of 9
-        if x % 3 == 0:
-            if y % 3 == 0:     # bottom left corner
-                can_values = self.bottom_left(x, y)
-            elif y % 3 == 1:   # bottom middle
-                can_values = self.bottom_middle(x, y)
-            else:              # bottom right
-                can_values = self.bottom_right(x, y)
-        elif x % 3 == 1:
-            if y % 3 == 0:    # middle left corner
-                can_values = self.middle_left(x, y)
-            elif y % 3 == 1:  # middle middle
-                can_values = self.middle_middle(x, y)
-            else:             # middle right
-                can_values = self.middle_right(x, y)
-        else:
-            if y % 3 == 0:    # top left corner
-                can_values = self.top_left(x, y)
-            elif y % 3 == 1:  # top middle
-                can_values = self.top_middle(x, y)
-            else:             # top right
-                can_values = self.top_middle(x, y)
-
-        return can_values
-
-    def bottom_left(self, x, y):
-        good = set()
-        bad = set()
-        for x_loc in range(x, x + 3):
-            for y_loc in range(y, y + 3):
-                if x_loc != x and y_loc != y:
-                    loc = self.coord_to_int(x_loc, y_loc)
-                    if loc in self.given_dict.keys():
-                        bad.add(self.given_dict[loc])
-        for i in range(len(self.domain)):
-            if i not in bad:
-                good.add(self.domain[i])
-        return good
-
-    def bottom_middle(self, x, y):
-        good = set()
-        bad = set()
-        for x_loc in range(x - 1, x + 2):
-            for y_loc in range(y, y + 3):
-                if x_loc != x and y_loc != y:
-                    loc = self.coord_to_int(x_loc, y_loc)
-                    if loc in self.given_dict.keys():
-                        bad.add(self.given_dict[loc])
-        for i in range(len(self.domain)):
-            if i not in bad:
-                good.add(self.domain[i])
-        return good
-
-    def bottom_right(self, x, y):
-        good = set()
-        bad = set()
-        for x_loc in range(x - 2, x + 1):
-            for y_loc in range(y, y + 3):
-                if x_loc != x and y_loc != y:
-                    loc = self.coord_to_int(x_loc, y_loc)
-                    if loc in self.given_dict.keys():
-                        bad.add(self.given_dict[loc])
-        for i in range(len(self.domain)):
-            if i not in bad:
-                good.add(self.domain[i])
-        return good
-
-    def middle_left(self, x, y):
-        good = set()
-        bad = set()
-        for x_loc in range(x, x + 3):
-            for y_loc in range(y - 1, y + 2):
-                if x_loc != x and y_loc != y:
-                    loc = self.coord_to_int(x_loc, y_loc)
-                    if loc in self.given_dict.keys():
-                        bad.add(self.given_dict[loc])
-        for i in range(len(self.domain)):
-            if i not in bad:
-                good.add(self.domain[i])
-        return good
-
-    def middle_middle(self, x, y):
-        good = set()
-        bad = set()
-        for x_loc in range(x - 1, x + 2):
-            for y_loc in range(y - 1, y + 2):
-                if x_loc != x and y_loc != y:
-                    loc = self.coord_to_int(x_loc, y_loc)
-                    if loc in self.given_dict.keys():
-                        bad.add(self.given_dict[loc])
-        for i in range(len(self.domain)):
-            if i not in bad:
-                good.add(self.domain[i])
-        return good
-
-    def middle_right(self, x, y):
-        good = set()
-        bad = set()
-        for x_loc in range(x - 2, x + 1):
-            for y_loc in range(y - 1, y + 2):
-                if x_loc != x and y_loc != y:
-                    loc = self.coord_to_int(x_loc, y_loc)
-                    if loc in self.given_dict.keys():
-                        bad.add(self.given_dict[loc])
-        for i in range(len(self.domain)):
-            if i not in bad:
-                good.add(self.domain[i])
-        return good
-
-    def top_left(self, x, y):
-        good = set()
-        bad = set()
-        for x_loc in range(x, x + 3):
-            for y_loc in range(y - 2, y + 1):
-                if x_loc != x and y_loc != y:
-                    loc = self.coord_to_int(x_loc, y_loc)
-                    if loc in self.given_dict.keys():
-                        bad.add(self.given_dict[loc])
-        for i in range(len(self.domain)):
-            if i not in bad:
-                good.add(self.domain[i])
-        return good
-
-    def top_middle(self, x, y):
-        good = set()
-        bad = set()
-        for x_loc in range(x - 1, x + 2):
-            for y_loc in range(y - 2, y + 1):
-                if x_loc != x and y_loc != y:
-                    loc = self.coord_to_int(x_loc, y_loc)
-                    if loc in self.given_dict.keys():
-                        bad.add(self.given_dict[loc])
-        for i in range(len(self.domain)):
-            if i not in bad:
-                good.add(self.domain[i])
-        return good
-
-    def top_right(self, x, y):
-        good = set()
-        bad = set()
-        for x_loc in range(x - 2, x + 1):
-            for y_loc in range(y - 2, y + 1):
-                if x_loc != x and y_loc != y:
-                    loc = self.coord_to_int(x_loc, y_loc)
-                    if loc in self.given_dict.keys():
-                        bad.add(self.given_dict[loc])
-        for i in range(len(self.domain)):
-            if i not in bad:
-                good.add(self.domain[i])
-        return good
-
-    # these can be hardcoded because it is sudoku
+    # given squares can only be their given value, as an index into self.domain
+    def set_domains(self):
+        domains = {}
+        for loc in self.given_dict.keys():
+            domains[loc] = [self.domain.index(self.given_dict[loc])]
+        return domains
+
     def coord_to_int(self, x, y):
-        return y * 10 + x
+        return y * self.size + x
 
     def int_to_coord(self, var):
-        return var % 10, int(var/10)
-
-    # calls backtrack search object from CSP, and returns output plus some syntax
-    def backtrack_search(self, mrv, lcv, inference):
-        print("this happened")
-        self.CSP.backtrack_search(mrv, lcv, inference)
-        print(self.CSP.assignment)
+        return var % self.size, int(var / self.size)
+
+    # calls backtrack search object from CSP, and returns output plus some syntax, options are passed on to
+    # the CSP search
+    def backtrack_search(self, mrv, lcv, inference, **options):
+        self.CSP.backtrack_search(mrv, lcv, inference, **options)
+        return self.solution_to_str(self.CSP.assignment) + "\n" + str(self.CSP.fails) + " fails" + "\n"
+
+    # backtrack search, served from given SolutionCache when the same problem was solved before, see
+    # ConstraintSatisfactionProblem.cached_search
+    def cached_search(self, cache, mrv, lcv, inference, **options):
+        self.CSP.cached_search(cache, mrv, lcv, inference, **options)
+        return self.solution_to_str(self.CSP.assignment) + "\n" + str(self.CSP.fails) + " fails" + "\n"
+
+    # runs several search configurations in parallel and keeps the first to finish, see
+    # Portfolio.portfolio_search, and returns output plus some syntax
+    def portfolio_search(self, configurations=None, workers=None, timeout=None):
+        self.CSP.portfolio_search(configurations, workers, timeout)
+        return self.solution_to_str(self.CSP.assignment) + "\n" + str(self.CSP.fails) + " fails" + "\n"
+
+    # solves with the specialized bitmask solver instead of the general CSP search, leaving the solution in
+    # the CSP assignment so it reads the same way, and returns output plus some syntax
+    def bitmask_search(self):
+        solver = get_solver(self.box_size)
+        solution = solver.solve(self.solver_values())
+        for loc in range(self.size * self.size):
+            self.CSP.assignment[loc] = None
+            if solution is not None:
+                x, y = self.int_to_coord(loc)
+                self.CSP.assignment[loc] = solution[(self.size - 1 - y) * self.size + x] - 1
+
+        return self.solution_to_str(self.CSP.assignment) + "\n" + str(solver.guesses) + " guesses" + "\n"
+
+    # adds given value at square x, y
+    def add_given(self, value, x, y):
+        loc = self.coord_to_int(x, y)
+        self.given_dict[loc] = value
+        self.domains[loc] = [self.domain.index(value)]
+        self.CSP.fix(loc, self.domain.index(value))
+
+    # empties square x, y if it was given
+    def remove_given(self, x, y):
+        loc = self.coord_to_int(x, y)
+        self.given_dict.pop(loc, None)
+        self.domains.pop(loc, None)
+        self.CSP.unfix(loc)
+
+    # solves again after givens changed, starting from the last solution, see
+    # ConstraintSatisfactionProblem.resolve
+    def resolve(self, mrv, lcv, inference, repair_steps=1000, **options):
+        self.CSP.resolve(mrv, lcv, inference, repair_steps, **options)
+        return self.solution_to_str(self.CSP.assignment) + "\n" + str(self.CSP.fails) + " fails" + "\n"
+
+    # returns number of solutions, counting no further than limit, found with the bitmask solver
+    def count_solutions(self, limit=2):
+        return get_solver(self.box_size).count_solutions(self.solver_values(), limit)
+
+    # returns true if the puzzle has exactly one solution
+    def has_unique_solution(self):
+        return self.count_solutions(2) == 1
+
+    # returns givens as a list of square values for the bitmask solver, which numbers squares from the top left
+    # corner, going right then down, with 0 for an empty square
+    def solver_values(self):
+        values = [0] * (self.size * self.size)
+        for loc in self.given_dict.keys():
+            x, y = self.int_to_coord(loc)
+            values[(self.size - 1 - y) * self.size + x] = self.given_dict[loc]
+        return values
+
+    # builds exact cover matrix with a column for every square, and for every value in every row, column and
+    # box. each row is one value in one square, givens only get their own value. returns the DancingLinks
+    # object and the (square, value index) of every row
+    def exact_cover_matrix(self):
+        squares = self.size * self.size
+        links = DancingLinks(4 * squares)
+
+        rows = []
+        for loc in range(squares):
+            x, y = self.int_to_coord(loc)
+            box = (y // self.box_size) * self.box_size + x // self.box_size
+            if loc in self.domains.keys():
+                values = self.domains[loc]
+            else:
+                values = range(self.size)
+            for value in values:
+                links.add_row([loc, squares + y * self.size + value, 2 * squares + x * self.size + value,
+                               3 * squares + box * self.size + value])
+                rows.append((loc, value))
+
+        return links, rows
+
+    # generator of every solution as a solution string, found with dancing links
+    def exact_covers(self):
+        links, rows = self.exact_cover_matrix()
+        for cover in links.search():
+            solution = [None] * (self.size * self.size)
+            for row in cover:
+                solution[rows[row][0]] = rows[row][1]
+            yield self.solution_to_str(solution)
+
+    # solves as an exact cover problem with dancing links, leaving the solution in the CSP assignment, and
+    # returns output plus some syntax
+    def exact_cover_search(self):
+        links, rows = self.exact_cover_matrix()
+        cover = links.solve()
+        for loc in range(self.size * self.size):
+            self.CSP.assignment[loc] = None
+        if cover is not None:
+            for row in cover:
+                self.CSP.assignment[rows[row][0]] = rows[row][1]
+
+        return self.solution_to_str(self.CSP.assignment) + "\n" + str(links.updates) + " updates" + "\n"
+
+    # returns solution as a grid of values, top row first, or the givens if there is no solution
+    def solution_to_str(self, solution):
+        sol_str = ""
+        for y in range(self.size - 1, -1, -1):
+            for x in range(self.size):
+                loc = self.coord_to_int(x, y)
+                if solution[loc] is not None:
+                    sol_str += SYMBOLS[solution[loc]]
+                elif loc in self.given_dict.keys():
+                    sol_str += SYMBOLS[self.given_dict[loc] - 1]
+                else:
+                    sol_str += "."
+            if y != 0:
+                sol_str += "\n"
+        return sol_str
@@ -0,0 +1,192 @@
+# sudoku solver specialized for boards of box_size^2 by box_size^2 squares. every row, column and box keeps a
+# bitset of the values already used in it, so the candidates of a square are three ors and a not, and
+# propagation of naked and hidden singles is done on whole bitsets
+class SudokuSolver:
+    def __init__(self, box_size):
+        self.box_size = box_size                    # 3 for a regular sudoku
+        self.size = box_size * box_size             # number of values, and of squares in every row
+        self.square_count = self.size * self.size   # number of squares on the board
+        self.full = (1 << self.size) - 1            # bitset of every value
+
+        # units are numbered rows first, then columns, then boxes. squares are numbered y * size + x
+        size = self.size
+        self.row_of = []
+        self.column_of = []
+        self.box_of = []
+        self.units = [[] for i in range(3 * size)]  # list of squares in every unit
+        for square in range(self.square_count):
+            x, y = square % size, square // size
+            box = (y // box_size) * box_size + x // box_size
+            self.row_of.append(y)
+            self.column_of.append(size + x)
+            self.box_of.append(2 * size + box)
+            self.units[y].append(square)
+            self.units[size + x].append(square)
+            self.units[2 * size + box].append(square)
+
+        self.guesses = 0    # number of values tried by search, for the last solve
+
+    # given list of square values, 0 for empty and 1..size otherwise, returns solved list of values or None
+    def solve(self, values):
+        if self.start(values) and self.search():
+            return list(self.board)
+        return None
+
+    # given list of square values as for solve, returns number of solutions, counting no further than limit,
+    # so a limit of 2 tells whether the solution is unique
+    def count_solutions(self, values, limit=2):
+        if not self.start(values):
+            return 0
+        return self.count(limit)
+
+    # fills in given list of square values, returns false if two givens contradict each other
+    def start(self, values):
+        self.guesses = 0
+        self.board = [0] * self.square_count    # value of every square, 0 if empty
+        self.used = [0] * (3 * self.size)       # bitset of values used in every unit
+        self.trail = []                         # squares in the order they were filled
+
+        for square in range(self.square_count):
+            if values[square]:
+                bit = 1 << (values[square] - 1)
+                if self.candidates(square) & bit == 0:  # given contradicts another given
+                    return False
+                self.place(square, bit)
+        return True
+
+    # returns bitset of values square can still be
+    def candidates(self, square):
+        return self.full & ~(self.used[self.row_of[square]] | self.used[self.column_of[square]] |
+                             self.used[self.box_of[square]])
+
+    # fills square with value given as a single bit
+    def place(self, square, bit):
+        self.board[square] = bit.bit_length()
+        self.used[self.row_of[square]] |= bit
+        self.used[self.column_of[square]] |= bit
+        self.used[self.box_of[square]] |= bit
+        self.trail.append(square)
+
+    # empties every square filled since given length of the trail
+    def undo(self, mark):
+        while len(self.trail) > mark:
+            square = self.trail.pop()
+            bit = 1 << (self.board[square] - 1)
+            self.board[square] = 0
+            self.used[self.row_of[square]] ^= bit
+            self.used[self.column_of[square]] ^= bit
+            self.used[self.box_of[square]] ^= bit
+
+    # fills naked singles (squares with one candidate) and hidden singles (values with one square left in
+    # some unit) until none are left. returns the empty square with fewest candidates and its candidates,
+    # (None, 0) if the board is full, or None if some square or unit can no longer be completed
+    def propagate(self):
+        while True:
+            progress = False
+            best = None
+            best_candidates = 0
+            best_count = self.size + 1
+
+            for square in range(self.square_count):
+                if self.board[square] == 0:
+                    candidates = self.candidates(square)
+                    if candidates == 0:
+                        return None
+                    if candidates & (candidates - 1) == 0:
+                        self.place(square, candidates)
+                        progress = True
+                    elif not progress:
+                        count = candidates.bit_count()
+                        if count < best_count:
+                            best, best_candidates, best_count = square, candidates, count
+
+            if progress:
+                continue
+
+            for unit in range(3 * self.size):
+                once = 0
+                twice = 0
+                for square in self.units[unit]:
+                    if self.board[square] == 0:
+                        candidates = self.candidates(square)
+                        twice |= once & candidates
+                        once |= candidates
+                if (once | self.used[unit]) != self.full:   # some value has nowhere to go
+                    return None
+
+                hidden = once & ~twice
+                while hidden:
+                    bit = hidden & -hidden
+                    hidden ^= bit
+                    for square in self.units[unit]:
+                        if self.board[square] == 0 and self.candidates(square) & bit:
+                            self.place(square, bit)
+                            progress = True
+                            break
+
+            if not progress:
+                return best, best_candidates
+
+    # depth first search over the square with fewest candidates, propagating after every guess
+    def search(self):
+        mark = len(self.trail)
+        result = self.propagate()
+        if result is None:
+            self.undo(mark)
+            return False
+
+        square, candidates = result
+        if square is None:
+            return True
+
+        while candidates:
+            bit = candidates & -candidates
+            candidates ^= bit
+            self.guesses += 1
+
+            inner = len(self.trail)
+            self.place(square, bit)
+            if self.search():
+                return True
+            self.undo(inner)
+
+        self.undo(mark)
+        return False
+
+    # same search as search, but goes on after every solution until limit of them are found, returns the
+    # number found and leaves the board as it was
+    def count(self, limit):
+        mark = len(self.trail)
+        result = self.propagate()
+        if result is None:
+            self.undo(mark)
+            return 0
+
+        square, candidates = result
+        found = 0
+        if square is None:
+            found = 1
+
+        while candidates and found < limit:
+            bit = candidates & -candidates
+            candidates ^= bit
+            self.guesses += 1
+
+            inner = len(self.trail)
+            self.place(square, bit)
+            found += self.count(limit - found)
+            self.undo(inner)
+
+        self.undo(mark)
+        return found
+
+
+# solvers are built once per box size and shared, since the unit and peer tables never change
+solvers = {}
+
+
+# returns the shared solver for given box size
+def get_solver(box_size):
+    if box_size not in solvers:
+        solvers[box_size] = SudokuSolver(box_size)
+    return solvers[box_size]
@@ -0,0 +1,101 @@
+from DomainStore import bits_to_values
+
+
+# for every variable and value, the number of values in the current domains of its neighbors that the value
+# would rule out, for the lcv heuristic. counts of a variable are brought up to date when it is ordered, from
+# what changed in each neighbor's domain since last time: unchanged neighbors cost nothing, and a few removed
+# or restored values only adjust the counts of the values they conflict with. values of assigned neighbors
+# are counted too, but once forward checking has run none of them conflict with what is left in the domain
+# of an unassigned variable
+class SupportCounts:
+    def __init__(self, csp):
+        self.csp = csp
+        self.constraints = csp.constraints
+        self.initial = list(csp.domains.domains)    # domain of every variable when counting started
+        self.masks = {}                             # dictionary mapping each arc to conflict masks per value
+
+        # per variable, list of conflict count per value, list of (neighbor, binary) pairs it is counted
+        # against, where every other variable of a global constraint is a neighbor only conflicting on the
+        # same value, and list of the domain of each neighbor when last counted. None until first ordered
+        self.counts = [None] * csp.assignment_length
+        self.neighbors = [None] * csp.assignment_length
+        self.seen = [None] * csp.assignment_length
+
+    # returns values left in the domain of var, least constraining first. a stable sort, so values that rule
+    # out as many keep the order they were given in
+    def order(self, values, var):
+        if self.counts[var] is None:
+            self.start(var)
+        self.refresh(var)
+        values.sort(key=self.counts[var].__getitem__)
+        return values
+
+    # sets up counts of var as if every neighbor's domain were empty, so refresh counts them all
+    def start(self, var):
+        neighbors = []
+        for neighbor in self.constraints.neighbors.get(var, ()):
+            neighbors.append((neighbor, True))
+        for g in self.constraints.globals_of.get(var, ()):
+            for other in self.constraints.global_constraints[g].variables:
+                if other != var:
+                    neighbors.append((other, False))
+
+        self.counts[var] = [0] * self.csp.domain_length
+        self.neighbors[var] = neighbors
+        self.seen[var] = [0] * len(neighbors)
+
+    # adjusts counts of var for the values removed from or restored to each neighbor's domain since it was
+    # last counted
+    def refresh(self, var):
+        counts = self.counts[var]
+        seen = self.seen[var]
+        domains = self.csp.domains.domains
+        values = None
+
+        for i in range(len(seen)):
+            neighbor, binary = self.neighbors[var][i]
+            current = domains[neighbor]
+            if current == seen[i]:
+                continue
+            restored = current & ~seen[i]
+            removed = seen[i] & ~current
+            seen[i] = current
+
+            changed = restored | removed
+            if not binary:
+                # only the same value conflicts
+                while changed:
+                    low = changed & -changed
+                    changed ^= low
+                    counts[low.bit_length() - 1] += 1 if restored & low else -1
+
+            elif changed.bit_count() * 4 <= self.initial[var].bit_count():
+                # few changes, adjust the counts of the values of var each one conflicts with
+                while changed:
+                    low = changed & -changed
+                    changed ^= low
+                    step = 1 if restored & low else -1
+                    mask = self.conflicts(neighbor, var, low.bit_length() - 1)
+                    while mask:
+                        bit = mask & -mask
+                        counts[bit.bit_length() - 1] += step
+                        mask ^= bit
+
+            else:
+                # many changes, recount this neighbor for every value of var
+                if values is None:
+                    values = bits_to_values(self.initial[var])
+                for value in values:
+                    mask = self.conflicts(var, neighbor, value)
+                    counts[value] += (restored & mask).bit_count() - (removed & mask).bit_count()
+
+    # returns bitset of values of var2, out of the ones it had when counting started, that are not allowed
+    # with value of var1
+    def conflicts(self, var1, var2, value):
+        masks = self.masks.get((var1, var2))
+        if masks is None:
+            masks = self.masks[(var1, var2)] = [None] * self.csp.domain_length
+        if masks[value] is None:
+            relation = self.constraints.get_constraints(var1, var2)
+            masks[value] = self.initial[var2] & ~relation.supports(value, self.initial[var2])
+        return masks[value]
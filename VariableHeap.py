@@ -0,0 +1,43 @@
+import heapq
+
+
+# unassigned variables ordered by fewest values left in their domain, ties broken by the most other variables
+# constrained, for the mrv heuristic. entries are never changed in place: a new one is pushed whenever the
+# domain store reports a change, and ones that no longer match the variable are dropped once they reach the
+# top, so choosing a variable takes amortized logarithmic time instead of a scan over every variable
+class VariableHeap:
+    def __init__(self, csp):
+        self.csp = csp
+        self.degrees = [csp.constraints.degree(var) for var in range(csp.assignment_length)]
+        self.heap = []          # list of (domain size, -degree, var) tuples
+        self.rebuild()
+        csp.domains.add_listener(self.update)
+
+    # pushes entry for current domain size of var, unless it is assigned
+    def update(self, var):
+        if self.csp.assignment[var] is None:
+            heapq.heappush(self.heap, (self.csp.domains.sizes[var], -self.degrees[var], var))
+
+    # returns unassigned variable with the fewest values left, or None if every variable is assigned
+    def peek(self):
+        heap = self.heap
+        assignment = self.csp.assignment
+        sizes = self.csp.domains.sizes
+
+        # stale entries pile up as domains shrink and grow back, so start over once they outnumber the rest
+        if len(heap) > 4 * self.csp.assignment_length + 64:
+            self.rebuild()
+
+        while heap:
+            size, degree, var = heap[0]
+            if assignment[var] is None and sizes[var] == size:
+                return var
+            heapq.heappop(heap)
+        return None
+
+    # replaces every entry with one per unassigned variable
+    def rebuild(self):
+        sizes = self.csp.domains.sizes
+        self.heap = [(sizes[var], -self.degrees[var], var) for var in range(self.csp.assignment_length)
+                     if self.csp.assignment[var] is None]
+        heapq.heapify(self.heap)
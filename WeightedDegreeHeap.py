@@ -0,0 +1,126 @@
+import heapq
+
+
+# unassigned variables ordered by smallest ratio of domain size to weighted degree, for the dom/wdeg heuristic.
+# the weighted degree of every unassigned variable, the sum of the weights of its constraints with other
+# unassigned variables, is kept up to date as variables are assigned and unassigned and as weights are bumped,
+# so choosing a variable never needs a scan over every variable and its neighbors. like VariableHeap, entries
+# are never changed in place: a new one is pushed whenever a domain or weighted degree changes, and ones that
+# no longer match the variable are dropped once they reach the top. ties are broken at random when seeded,
+# otherwise by smallest variable
+class WeightedDegreeHeap:
+    def __init__(self, csp):
+        self.csp = csp
+        constraints = csp.constraints
+
+        # number of unassigned variables in each global constraint
+        self.free = [0] * len(constraints.global_constraints)
+        for g in range(len(constraints.global_constraints)):
+            for var in constraints.global_constraints[g].variables:
+                if csp.assignment[var] is None:
+                    self.free[g] += 1
+
+        self.weighted_degrees = [0] * csp.assignment_length
+        for var in range(csp.assignment_length):
+            self.weighted_degrees[var] = self.count(var)
+
+        self.heap = []          # list of (score, tie, var, domain size, weighted degree) tuples
+        self.rebuild()
+        csp.domains.add_listener(self.update)
+
+    # returns weighted degree of var from scratch
+    def count(self, var):
+        csp = self.csp
+        weighted_degree = 0
+        for neighbor in csp.constraints.neighbors.get(var, ()):
+            if csp.assignment[neighbor] is None:
+                weighted_degree += csp.arc_weights.get((min(var, neighbor), max(var, neighbor)), 1)
+        for g in csp.constraints.globals_of.get(var, ()):
+            others = self.free[g] - (1 if csp.assignment[var] is None else 0)
+            if others > 0:
+                weighted_degree += csp.global_weights[g]
+        return weighted_degree
+
+    # pushes entry for current domain size and weighted degree of var, unless it is assigned
+    def update(self, var):
+        csp = self.csp
+        if csp.assignment[var] is None:
+            size = csp.domains.sizes[var]
+            weighted_degree = self.weighted_degrees[var]
+            tie = var if csp.random is None else csp.random.random()
+            heapq.heappush(self.heap, (size / max(weighted_degree, 1), tie, var, size, weighted_degree))
+
+    # adds change to the weighted degree of var
+    def adjust(self, var, change):
+        self.weighted_degrees[var] += change
+        self.update(var)
+
+    # takes the constraints of var, just assigned, out of the weighted degrees of its unassigned neighbors
+    def assign(self, var):
+        csp = self.csp
+        for neighbor in csp.constraints.neighbors.get(var, ()):
+            if csp.assignment[neighbor] is None:
+                self.adjust(neighbor, -csp.arc_weights.get((min(var, neighbor), max(var, neighbor)), 1))
+        for g in csp.constraints.globals_of.get(var, ()):
+            self.free[g] -= 1
+            if self.free[g] == 1:   # the one variable left has no one left to share g with
+                self.adjust(self.unassigned_in(g), -csp.global_weights[g])
+
+    # puts the constraints of var, just unassigned, back into the weighted degrees of its unassigned neighbors,
+    # and counts its own again, since it was not kept up to date while var was assigned
+    def unassign(self, var):
+        csp = self.csp
+        for g in csp.constraints.globals_of.get(var, ()):
+            self.free[g] += 1
+            if self.free[g] == 2:   # the variable that was left alone in g shares it with var again
+                self.adjust(self.unassigned_in(g, var), csp.global_weights[g])
+        for neighbor in csp.constraints.neighbors.get(var, ()):
+            if csp.assignment[neighbor] is None:
+                self.adjust(neighbor, csp.arc_weights.get((min(var, neighbor), max(var, neighbor)), 1))
+        self.weighted_degrees[var] = self.count(var)
+        self.update(var)
+
+    # adds 1 to the weighted degrees of both ends of the arc with given key, if they are both unassigned
+    def bump_arc(self, key):
+        if self.csp.assignment[key[0]] is None and self.csp.assignment[key[1]] is None:
+            self.adjust(key[0], 1)
+            self.adjust(key[1], 1)
+
+    # adds 1 to the weighted degrees of the unassigned variables of global constraint g, if there are two or more
+    def bump_global(self, g):
+        if self.free[g] > 1:
+            for var in self.csp.constraints.global_constraints[g].variables:
+                if self.csp.assignment[var] is None:
+                    self.adjust(var, 1)
+
+    # returns an unassigned variable of global constraint g other than skip
+    def unassigned_in(self, g, skip=None):
+        for var in self.csp.constraints.global_constraints[g].variables:
+            if var != skip and self.csp.assignment[var] is None:
+                return var
+        return None
+
+    # returns unassigned variable with the smallest ratio of domain size to weighted degree, or None if every
+    # variable is assigned
+    def peek(self):
+        heap = self.heap
+        assignment = self.csp.assignment
+        sizes = self.csp.domains.sizes
+        weighted_degrees = self.weighted_degrees
+
+        # stale entries pile up as domains and weights change, so start over once they outnumber the rest
+        if len(heap) > 4 * self.csp.assignment_length + 64:
+            self.rebuild()
+
+        while heap:
+            score, tie, var, size, weighted_degree = heap[0]
+            if assignment[var] is None and sizes[var] == size and weighted_degrees[var] == weighted_degree:
+                return var
+            heapq.heappop(heap)
+        return None
+
+    # replaces every entry with one per unassigned variable
+    def rebuild(self):
+        self.heap = []
+        for var in range(self.csp.assignment_length):
+            self.update(var)
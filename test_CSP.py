@@ -1,8 +1,16 @@
 # Paolo Takagi-Atilano, October 17, 2017
 
+import os
+import tempfile
+
 from MapColoringCSP import MapColoringCSP
 from CircuitBoardCSP import CircuitBoardCSP
 from SudokuCSP import SudokuCSP
+from SolutionCache import SolutionCache
+from SudokuBatch import batch_solve
+
+# solution cache and compiled files are written here, and removed at the end
+temp_dir = tempfile.TemporaryDirectory()
 
 # map coloring csp
 variables = ["NT", "T", "V", "WA", "NSW", "Q", "SA"]
@@ -34,6 +42,32 @@ print("    both heuristics only:")
 print("       ", australia.backtrack_search(True, True, False))
 print("    both heuristics only w/ inference:")
 print("       ", australia.backtrack_search(True, True, True))
+print("    connected components, solved as trees where possible:")
+print("       ", australia.decomposed_search(True, False, True))
+print("    min-conflicts local search:")
+print("       ", australia.min_conflicts_search(1000, seed=0))
+print("    T and V made adjacent, solved again from the last coloring:")
+australia.add_edge("T", "V")
+print("       ", australia.resolve(True, False, True))
+print("    portfolio of search configurations:")
+print("       ", australia.portfolio_search(workers=2, timeout=10))
+print("    search tree split between processes:")
+australia.CSP.parallel_search(True, False, True, workers=2)
+print("       ", australia.solution_to_str())
+
+# counts search events as they happen
+events = {}
+
+
+def count_event(event, var, value):
+    events[event] = events.get(event, 0) + 1
+
+
+print("    events of naive backtrack:")
+australia.CSP.add_listener(count_event)
+australia.backtrack_search(False, False, False)
+australia.CSP.remove_listener(count_event)
+print("       ", events)
 
 # circuit board CSP
 length = 10
@@ -59,6 +93,29 @@ print("both heuristics only:")
 print(circuit.backtrack_search(True, True, False))
 print("both heuristics only w/ inference:")
 print(circuit.backtrack_search(True, True, True))
+print("dancing links exact cover:")
+print(circuit.exact_cover_search(False))
+print("number of layouts:")
+print(circuit.count_layouts())
+print("number of layouts found by search, and whether it matches the count:")
+found = len(list(circuit.layouts(True, False, True)))
+print(found, found == circuit.count_layouts())
+print("piece a placed at 7, 0, solved again from the last layout:")
+circuit.place_piece(0, 7, 0)
+print(circuit.resolve(True, False, True))
+circuit.unplace_piece(0)
+
+cache = SolutionCache(os.path.join(temp_dir.name, "solutions.db"))
+print("solution cache, solved then served from the cache:")
+print(circuit.cached_search(cache, True, False, True))
+print(circuit.cached_search(cache, True, False, True))
+print(cache.hits, "hits", cache.misses, "misses")
+cache.close()
+
+compiled = os.path.join(temp_dir.name, "circuit.csp")
+print("compiled file, built and saved then loaded:")
+print(CircuitBoardCSP(length, height, pieces_list, True, compiled=compiled).backtrack_search(True, False, True))
+print(CircuitBoardCSP(length, height, pieces_list, True, compiled=compiled).backtrack_search(True, False, True))
 
 # sudoku CSP
 # format: (value, x, y); 0,0 is the bottom left corner
@@ -75,4 +132,25 @@ sudoku = SudokuCSP(given_numbers)
 #for key in sudoku.constraints.keys():
     #print("key", key)
     #print("constraints", sudoku.constraints[key])
-#sudoku.backtrack_search(False, False, False)
+print("\nsudoku SudokuCSP:")
+print("mrv heuristic only w/ inference:")
+print(sudoku.backtrack_search(True, False, True))
+print("bitmask solver:")
+print(sudoku.bitmask_search())
+print("dancing links exact cover:")
+print(sudoku.exact_cover_search())
+print("unique solution:")
+print(sudoku.has_unique_solution())
+
+compiled = os.path.join(temp_dir.name, "sudoku.csp")
+print("compiled file, built and saved then loaded:")
+SudokuCSP([], compiled=compiled)
+print(SudokuCSP(given_numbers, compiled=compiled).backtrack_search(True, False, True))
+
+line = "".join(str(value) if value else "." for value in sudoku.solver_values())
+print("batch solver, in this process and in two workers:")
+for workers in (1, 2):
+    for puzzle, solution, guesses, seconds in batch_solve([line, "# comment", line[:-1]], workers=workers):
+        print(solution, guesses, "guesses")
+
+temp_dir.cleanup()